@@ -1,35 +1,157 @@
 # app.py
-from flask import Flask
+from flask import Flask, request
 from flask_cors import CORS
+import logging
 import os
+from datetime import timedelta
 from dotenv import load_dotenv
+from werkzeug.middleware.proxy_fix import ProxyFix
 from extensions import db, jwt, migrate
+from database import resolve_database_url, engine_options, sqlite_pragmas, init_engine
+from logs import init_logging
+from metrics import init_metrics
+from jobs import init_jobs
+from revocation import init_revocation
 
 load_dotenv()
 
-def create_app():
+logger = logging.getLogger(__name__)
+
+# Ключи по умолчанию годятся только для разработки
+DEFAULT_SECRET_KEY = 'super-secret-key-12345-fixed'
+DEFAULT_JWT_SECRET_KEY = 'jwt-super-secret-key-67890-fixed'
+
+def warn_untrusted_proxy(app):
+    """Один раз предупреждает, если запросы идут через прокси, а PROXY_TRUSTED_HOPS=0.
+
+    Тогда у всех анонимных клиентов IP прокси: один общий лимит жалоб и обратной связи
+    на весь сайт, и в каждой жалобе сохраняется адрес прокси.
+    """
+    warned = []
+
+    @app.before_request
+    def check_forwarded_for():
+        if not warned and 'X-Forwarded-For' in request.headers:
+            warned.append(True)
+            logger.warning('Запрос пришел через прокси (X-Forwarded-For), но PROXY_TRUSTED_HOPS=0: '
+                           'IP клиента подменяется адресом прокси. Задайте PROXY_TRUSTED_HOPS',
+                           extra={'remote_addr': request.remote_addr})
+
+def create_app(test_config=None):
     app = Flask(__name__)
     
     basedir = os.path.abspath(os.path.dirname(__file__))
-    database_path = os.path.join(basedir, 'instance', 'unost.db')
     
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{database_path}'
-    app.config['SECRET_KEY'] = 'super-secret-key-12345-fixed'
-    app.config['JWT_SECRET_KEY'] = 'jwt-super-secret-key-67890-fixed'
-    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = False
+    # БД берется из DATABASE_URL, по умолчанию instance/unost.db
+    app.config['SQLALCHEMY_DATABASE_URI'] = resolve_database_url(basedir)
+    app.config['SQLITE_PRAGMAS'] = sqlite_pragmas()
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', DEFAULT_SECRET_KEY)
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', DEFAULT_JWT_SECRET_KEY)
+    # Короткие access-токены, продление по refresh-токену через POST /api/refresh
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', 15)))
+    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=int(os.getenv('JWT_REFRESH_TOKEN_DAYS', 30)))
+    # Отклонять токены без срока действия, выданные до появления refresh-токенов
+    app.config['JWT_REJECT_NON_EXPIRING'] = os.getenv('JWT_REJECT_NON_EXPIRING', 'true').lower() in ('1', 'true', 'yes')
+    # Отозванные токены (POST /api/logout): как часто каждый процесс дочитывает их из БД и чистит истекшие
+    app.config['JWT_REVOCATION_SYNC_SECONDS'] = float(os.getenv('JWT_REVOCATION_SYNC_SECONDS', 5))
+    app.config['JWT_REVOCATION_PRUNE_SECONDS'] = float(os.getenv('JWT_REVOCATION_PRUNE_SECONDS', 3600))
     app.config['JWT_TOKEN_LOCATION'] = ['headers']
     app.config['JWT_HEADER_NAME'] = 'Authorization'
     app.config['JWT_HEADER_TYPE'] = 'Bearer'
+    # Как часто (в секундах) перепроверять claims_version пользователя в БД
+    app.config['JWT_CLAIMS_CHECK_TTL'] = int(os.getenv('JWT_CLAIMS_CHECK_TTL', 60))
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
-    print("=== КОНФИГУРАЦИЯ JWT ===")
-    print(f"JWT_SECRET_KEY: {app.config['JWT_SECRET_KEY']}")
-    print(f"SECRET_KEY: {app.config['SECRET_KEY']}")
+    # Хеширование паролей: метод и стоимость, размер пула процессов и очереди к нему
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    app.config['PASSWORD_POOL_WORKERS'] = int(os.getenv('PASSWORD_POOL_WORKERS', os.cpu_count() or 1))
+    app.config['PASSWORD_POOL_QUEUE'] = int(os.getenv('PASSWORD_POOL_QUEUE', 4 * app.config['PASSWORD_POOL_WORKERS'] or 1))
+    app.config['PASSWORD_POOL_TIMEOUT'] = float(os.getenv('PASSWORD_POOL_TIMEOUT', 2))
+    
+    # Отдача файлов портфолио: direct (Flask), x-accel (nginx) или x-sendfile (Apache/lighttpd)
+    app.config['PORTFOLIO_DOWNLOAD_MODE'] = os.getenv('PORTFOLIO_DOWNLOAD_MODE', 'direct')
+    app.config['PORTFOLIO_ACCEL_PREFIX'] = os.getenv('PORTFOLIO_ACCEL_PREFIX', '/protected/portfolio/')
+    # Сколько файлов одного запроса записывать на диск (в хранилище) одновременно
+    app.config['PORTFOLIO_UPLOAD_WORKERS'] = int(os.getenv('PORTFOLIO_UPLOAD_WORKERS', 4))
+    # Хранилище файлов портфолио: local (подкаталоги ab/cd/ в PORTFOLIO_STORAGE_ROOT) или s3
+    app.config['PORTFOLIO_STORAGE'] = os.getenv('PORTFOLIO_STORAGE', 'local')
+    app.config['PORTFOLIO_STORAGE_ROOT'] = os.path.abspath(os.getenv('PORTFOLIO_STORAGE_ROOT', os.path.join(basedir, 'uploads', 'portfolio')))
+    app.config['PORTFOLIO_S3_BUCKET'] = os.getenv('PORTFOLIO_S3_BUCKET')
+    app.config['PORTFOLIO_S3_PREFIX'] = os.getenv('PORTFOLIO_S3_PREFIX', 'portfolio/')
+    # Для MinIO или moto server - их адрес, для AWS пусто
+    app.config['PORTFOLIO_S3_ENDPOINT_URL'] = os.getenv('PORTFOLIO_S3_ENDPOINT_URL')
+    app.config['PORTFOLIO_S3_REGION'] = os.getenv('PORTFOLIO_S3_REGION')
+    # Срок жизни ссылки на скачивание (секунды)
+    app.config['PORTFOLIO_S3_URL_TTL'] = int(os.getenv('PORTFOLIO_S3_URL_TTL', 300))
+    
+    # Прием жалоб и обратной связи: sync (коммит на запрос) или batched (очередь и запись пачками)
+    app.config['INGEST_MODE'] = os.getenv('INGEST_MODE', 'sync')
+    app.config['INGEST_QUEUE_SIZE'] = int(os.getenv('INGEST_QUEUE_SIZE', 10000))
+    app.config['INGEST_BATCH_SIZE'] = int(os.getenv('INGEST_BATCH_SIZE', 200))
+    app.config['INGEST_FLUSH_INTERVAL_MS'] = int(os.getenv('INGEST_FLUSH_INTERVAL_MS', 200))
+    # Куда уходят принятые (202) строки, если БД так и не приняла пачку; дописать - `flask ingest-replay`
+    app.config['INGEST_DEAD_LETTER_PATH'] = os.path.abspath(os.getenv('INGEST_DEAD_LETTER_PATH', os.path.join(basedir, 'instance', 'ingest-dead-letter.ndjson')))
+    
+    # Фоновые задачи (обработка загруженных файлов): потоков на процесс, 0 - только `flask jobs-work`
+    app.config['JOBS_WORKERS'] = int(os.getenv('JOBS_WORKERS', 1))
+    app.config['JOBS_POLL_INTERVAL_MS'] = int(os.getenv('JOBS_POLL_INTERVAL_MS', 2000))
+    app.config['JOBS_MAX_ATTEMPTS'] = int(os.getenv('JOBS_MAX_ATTEMPTS', 5))
+    # Пауза перед повтором (секунды), удваивается с каждой попыткой
+    app.config['JOBS_RETRY_DELAY'] = float(os.getenv('JOBS_RETRY_DELAY', 5))
+    # Через сколько секунд задача в статусе running считается брошенной
+    app.config['JOBS_LOCK_TIMEOUT'] = int(os.getenv('JOBS_LOCK_TIMEOUT', 600))
+    
+    # Кэш профилей студентов в памяти процесса
+    app.config['PROFILE_CACHE_SIZE'] = int(os.getenv('PROFILE_CACHE_SIZE', 10000))
+    app.config['PROFILE_CACHE_TTL'] = int(os.getenv('PROFILE_CACHE_TTL', 60))
+    # Справочник групп: как быстро воркер увидит группу, созданную в другом процессе
+    app.config['GROUPS_CACHE_TTL'] = int(os.getenv('GROUPS_CACHE_TTL', 60))
+    
+    # Ограничение частоты анонимных записей по IP: 'N/second|minute|hour|day', пусто - без лимита
+    app.config['RATE_LIMIT_ENABLED'] = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    app.config['RATE_LIMIT_BACKEND'] = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    app.config['RATE_LIMIT_MAX_KEYS'] = int(os.getenv('RATE_LIMIT_MAX_KEYS', 100000))
+    app.config['RATE_LIMITS'] = {
+        'complaints': os.getenv('RATE_LIMIT_COMPLAINTS', '10/minute'),
+        'feedback': os.getenv('RATE_LIMIT_FEEDBACK', '10/minute')
+    }
+    # Сколько своих прокси (nginx и т.п.) стоит перед приложением: IP клиента берется из
+    # X-Forwarded-For, дописанного последним из них. 0 - заголовку не доверять, IP соединения
+    app.config['PROXY_TRUSTED_HOPS'] = int(os.getenv('PROXY_TRUSTED_HOPS', 0))
+    
+    # Логи: JSON в stdout через очередь; DEBUG включает записи с горячих путей
+    app.config['LOG_LEVEL'] = os.getenv('LOG_LEVEL', 'INFO').upper()
+    
+    # Метрики запросов (число и время SQL на запрос) для /api/metrics и заголовок Server-Timing
+    app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    app.config['SERVER_TIMING_ENABLED'] = os.getenv('SERVER_TIMING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Переопределение настроек для проверок и бенчмарков (временная БД и т.п.)
+    if test_config:
+        app.config.update(test_config)
+    
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+    
+    init_logging(app)
+    if app.config['SECRET_KEY'] == DEFAULT_SECRET_KEY or app.config['JWT_SECRET_KEY'] == DEFAULT_JWT_SECRET_KEY:
+        logger.warning('SECRET_KEY или JWT_SECRET_KEY не заданы в окружении, используются ключи для разработки')
+    
+    app.config['USE_X_SENDFILE'] = app.config['PORTFOLIO_DOWNLOAD_MODE'] == 'x-sendfile'
+    
+    if app.config['PROXY_TRUSTED_HOPS'] > 0:
+        hops = app.config['PROXY_TRUSTED_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+    else:
+        warn_untrusted_proxy(app)
     
     # Инициализация расширений
     db.init_app(app)
-    migrate.init_app(app, db)
+    init_engine(app)
+    init_metrics(app)
+    init_jobs(app)
+    migrate.init_app(app, db, directory=os.path.join(basedir, 'migrations'))
     jwt.init_app(app)
+    init_revocation(app)
     
     CORS(app, 
          origins=["http://юность.панксквад.рф", "https://юность.панксквад.рф", "http://localhost:5173", "http://127.0.0.1:5173"],
@@ -37,16 +159,18 @@ def create_app():
          allow_headers=["Content-Type", "Authorization", "Access-Control-Allow-Headers"],
          supports_credentials=True)
     
-    # Создаем папку для загрузок портфолио
-    uploads_dir = os.path.join(basedir, 'uploads', 'portfolio')
-    os.makedirs(uploads_dir, exist_ok=True)
-    print(f"✅ Папка для загрузок создана: {uploads_dir}")
-    
-    from routes import auth_routes, student_routes, complaint_routes, feedback_routes
+    from routes import auth_routes, student_routes, complaint_routes, feedback_routes, grade_routes
+    from uploads import MAX_UPLOAD_SIZE
+    # Werkzeug обрывает тело запроса сверх лимита еще до разбора multipart
+    app.config.setdefault('MAX_CONTENT_LENGTH', MAX_UPLOAD_SIZE + 64 * 1024)
     app.register_blueprint(auth_routes)
     app.register_blueprint(student_routes)
     app.register_blueprint(complaint_routes)
     app.register_blueprint(feedback_routes)
+    app.register_blueprint(grade_routes)
+    
+    from commands import register_commands
+    register_commands(app)
     
     return app
 
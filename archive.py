@@ -0,0 +1,77 @@
+import io
+import logging
+import os
+import zipfile
+from datetime import datetime
+from storage import BlobNotFound, get_storage
+from uploads import CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Уже сжатые форматы кладутся в архив как есть: повторное сжатие тратит CPU без выигрыша
+STORED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'docx'}
+
+class _ZipOutput(io.RawIOBase):
+    """Неперематываемый приемник для ZipFile: записанное забирается кусками через take().
+
+    Без seek ZipFile пишет размеры и CRC после данных (data descriptor),
+    поэтому архив не нужно держать целиком ни в памяти, ни на диске.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def archive_name(filename, used):
+    """Имя в архиве без совпадений: второй report.pdf станет report (2).pdf"""
+    name = filename or 'file'
+    stem, ext = os.path.splitext(name)
+    number = 1
+    while name.lower() in used:
+        number += 1
+        name = f'{stem} ({number}){ext}'
+    used.add(name.lower())
+    return name
+
+def portfolio_archive(portfolio_files):
+    """Генератор байтов ZIP-архива из файлов портфолио, читаемых из хранилища кусками по CHUNK_SIZE"""
+    storage = get_storage()
+    output = _ZipOutput()
+    used = set()
+    with zipfile.ZipFile(output, 'w') as archive:
+        for portfolio_file in portfolio_files:
+            extension = portfolio_file.filename.rsplit('.', 1)[-1].lower()
+            info = zipfile.ZipInfo(
+                archive_name(portfolio_file.filename, used),
+                date_time=(portfolio_file.uploaded_at or datetime.utcnow()).timetuple()[:6]
+            )
+            info.compress_type = zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            try:
+                source = storage.open(portfolio_file.saved_filename)
+            except BlobNotFound:
+                # Заголовок ответа уже ушел, поэтому пропускаем файл, а не обрываем архив
+                logger.warning('Файл портфолио не найден в хранилище', extra={'file_id': portfolio_file.id})
+                continue
+            with source, archive.open(info, 'w') as target:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    target.write(chunk)
+                    data = output.take()
+                    if data:
+                        yield data
+            # Остаток сжатых данных и data descriptor файла
+            data = output.take()
+            if data:
+                yield data
+    # Центральный каталог дописывается при закрытии ZipFile
+    yield output.take()
@@ -0,0 +1,111 @@
+from collections import namedtuple
+from functools import wraps
+import time
+from flask import jsonify, current_app
+from flask_jwt_extended import create_access_token, create_refresh_token, verify_jwt_in_request, get_jwt, get_jwt_identity
+from extensions import db
+from models import User, Student
+
+# Кто делает запрос: всё, что нужно для авторизации, берётся из claims токена
+Identity = namedtuple('Identity', ['user_id', 'role', 'student_id'])
+
+# user_id -> (claims_version, момент, до которого значение считается свежим)
+_claims_versions = {}
+
+def identity_claims(user, student_id=None):
+    return {
+        'role': user.role,
+        'student_id': student_id,
+        'cv': user.claims_version or 0
+    }
+
+def create_user_token(user, student_id=None):
+    """Access-токен с ролью и student_id в дополнительных claims"""
+    return create_access_token(identity=str(user.id), additional_claims=identity_claims(user, student_id))
+
+def create_user_refresh_token(user):
+    """Refresh-токен: роль в нем не хранится, при обновлении она берется из БД"""
+    return create_refresh_token(identity=str(user.id), additional_claims={'cv': user.claims_version or 0})
+
+def access_token_lifetime():
+    """Срок жизни access-токена в секундах (None - бессрочный)"""
+    expires = current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
+    return int(expires.total_seconds()) if expires else None
+
+def token_response(user, student_id=None):
+    """Поля ответа входа и регистрации: access- и refresh-токен, срок жизни access-токена"""
+    return {
+        'token': create_user_token(user, student_id),
+        'refresh_token': create_user_refresh_token(user),
+        'expires_in': access_token_lifetime()
+    }
+
+def invalidate_claims(user):
+    """Отзывает claims во всех ранее выданных токенах пользователя (например, при смене роли).
+
+    Версия сохраняется в БД вместе с остальными изменениями пользователя,
+    коммит остаётся за вызывающим кодом.
+    """
+    user.claims_version = (user.claims_version or 0) + 1
+    _claims_versions[user.id] = (user.claims_version, time.monotonic() + current_app.config['JWT_CLAIMS_CHECK_TTL'])
+
+def _current_claims_version(user_id):
+    # В других процессах версия подтягивается не чаще раза в JWT_CLAIMS_CHECK_TTL секунд
+    cached = _claims_versions.get(user_id)
+    now = time.monotonic()
+    if cached and cached[1] > now:
+        return cached[0]
+
+    version = db.session.query(User.claims_version).filter_by(id=user_id).scalar()
+    _claims_versions[user_id] = (version, now + current_app.config['JWT_CLAIMS_CHECK_TTL'])
+    return version
+
+def current_identity():
+    """Identity из проверенного токена или None, если claims отозваны"""
+    claims = get_jwt()
+    user_id = int(get_jwt_identity())
+
+    if 'role' not in claims:
+        # Токены, выданные до появления claims: определяем роль по БД
+        user = db.session.get(User, user_id)
+        if not user:
+            return None
+        student = Student.query.filter_by(user_id=user_id).first()
+        return Identity(user_id, user.role, student.id if student else None)
+
+    version = _current_claims_version(user_id)
+    if version is None or claims.get('cv', 0) < version:
+        return None
+    return Identity(user_id, claims['role'], claims.get('student_id'))
+
+def roles_required(*roles):
+    """Проверяет токен и роль, передаёт обработчику identity=Identity(...)"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            verify_jwt_in_request()
+            identity = current_identity()
+            if identity is None:
+                return jsonify({'error': 'Данные токена устарели, войдите заново'}), 401
+            if roles and identity.role not in roles:
+                return jsonify({'error': 'Доступ запрещен'}), 403
+            return fn(*args, identity=identity, **kwargs)
+        return wrapper
+    return decorator
+
+def admin_required(fn):
+    return roles_required('admin')(fn)
+
+def teacher_required(fn):
+    """Преподаватели и админы"""
+    return roles_required('admin', 'teacher')(fn)
+
+def student_required(fn):
+    """Пропускает только пользователей с профилем студента"""
+    @roles_required()
+    @wraps(fn)
+    def wrapper(*args, identity, **kwargs):
+        if identity.student_id is None:
+            return jsonify({'error': 'Студент не найден'}), 404
+        return fn(*args, identity=identity, **kwargs)
+    return wrapper
@@ -0,0 +1,50 @@
+"""Общая обвязка бенчмарков: приложение на временной SQLite БД.
+
+Схема создается миграциями (как `flask db upgrade`), а не db.create_all(): иначе
+в БД не будет FTS-таблиц поиска и замеры разойдутся с продакшеном.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+from app import create_app
+from commands import apply_migrations
+from extensions import db
+
+
+@contextmanager
+def bench_app(config=None):
+    """Приложение на временной БД с блобами портфолио в той же временной папке.
+
+    config дополняет и переопределяет настройки по умолчанию. При выходе фоновые
+    потоки и пулы останавливаются, соединения с БД закрываются, папка удаляется.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            'PORTFOLIO_STORAGE': 'local',
+            'PORTFOLIO_STORAGE_ROOT': os.path.join(tmp, 'portfolio'),
+            'LOG_LEVEL': 'WARNING',
+            **(config or {})
+        })
+        with app.app_context():
+            apply_migrations()
+        try:
+            yield app
+        finally:
+            stop_background(app)
+            with app.app_context():
+                db.engine.dispose()
+
+
+def stop_background(app):
+    """Дописывает очередь приема и останавливает обработчики задач и пул хеширования"""
+    writer = app.extensions.pop('submission_writer', None)
+    if writer:
+        writer.close()
+    job_queue = app.extensions.pop('job_queue', None)
+    if job_queue:
+        job_queue.close()
+    pool = app.extensions.pop('password_pool', None)
+    if pool:
+        pool.shutdown()
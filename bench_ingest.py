@@ -0,0 +1,72 @@
+"""Бенчмарк приема жалоб: коммит на каждый запрос (sync) против записи пачками (batched).
+
+Запуск: python bench_ingest.py [--requests 2000] [--threads 16] [--batch-size 200] [--interval-ms 200]
+Для каждого режима поднимается приложение на временной SQLite БД, и из нескольких
+потоков отправляются POST /api/complaints через test client. В режиме batched время
+включает дозапись очереди, то есть момент, когда все жалобы действительно в БД.
+"""
+import argparse
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_app import bench_app
+from models import Complaint
+
+
+def bench_mode(mode, args):
+    with bench_app({
+        'INGEST_MODE': mode,
+        'INGEST_BATCH_SIZE': args.batch_size,
+        'INGEST_FLUSH_INTERVAL_MS': args.interval_ms,
+        'INGEST_QUEUE_SIZE': max(args.requests, 1),
+        'RATE_LIMIT_ENABLED': False
+    }) as app:
+        def submit(i):
+            client = app.test_client()
+            started = time.perf_counter()
+            response = client.post('/api/complaints', json={'complaint_text': f'Жалоба {i}'},
+                                   headers={'User-Agent': 'bench'})
+            return response.status_code, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            results = list(executor.map(submit, range(args.requests)))
+        accepted = time.perf_counter() - started
+
+        writer = app.extensions.get('submission_writer')
+        if writer:
+            writer.close()
+        durable = time.perf_counter() - started
+
+        with app.app_context():
+            stored = Complaint.query.count()
+
+    latencies = sorted(duration for _, duration in results)
+    return {
+        'mode': mode,
+        'accepted_per_sec': len(results) / accepted,
+        'durable_per_sec': stored / durable,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'stored': stored,
+        'statuses': dict(Counter(status for status, _ in results))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--interval-ms', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'режим':<8} {'принято/с':>10} {'в БД/с':>8} {'p95, мс':>8} {'в БД':>6}  статусы")
+    for mode in ('sync', 'batched'):
+        result = bench_mode(mode, args)
+        print(f"{result['mode']:<8} {result['accepted_per_sec']:>10.1f} {result['durable_per_sec']:>8.1f} "
+              f"{result['p95_ms']:>8.1f} {result['stored']:>6}  {result['statuses']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Бенчмарк пропускной способности /api/login для разных настроек хеширования паролей.
+
+Запуск: python bench_login.py [--requests 200] [--threads 16] [--workers 4] [--methods ...]
+Для каждого метода поднимается приложение на временной SQLite БД, создается
+пользователь и из нескольких потоков выполняются входы через test client.
+Ответы 503 - это отказы пула хеширования при переполнении очереди.
+"""
+import argparse
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_app import bench_app
+from extensions import db
+from models import User
+
+DEFAULT_METHODS = [
+    'pbkdf2:sha256:260000',
+    'pbkdf2:sha256:600000',
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1',
+    'scrypt:65536:8:1'
+]
+
+
+def bench_method(method, args):
+    with bench_app({
+        'PASSWORD_HASH_METHOD': method,
+        'PASSWORD_POOL_WORKERS': args.workers,
+        'PASSWORD_POOL_QUEUE': args.queue or 4 * args.workers or 1
+    }) as app:
+        with app.app_context():
+            user = User(email='bench@college.ru', role='student')
+            user.set_password('bench-password')
+            db.session.add(user)
+            db.session.commit()
+
+        def login(_):
+            client = app.test_client()
+            started = time.perf_counter()
+            response = client.post('/api/login', json={'email': 'bench@college.ru', 'password': 'bench-password'})
+            return response.status_code, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            results = list(executor.map(login, range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+        statuses = Counter(status for status, _ in results)
+        latencies = sorted(duration for status, duration in results if status == 200)
+        p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0
+
+    return {
+        'method': method,
+        'ok_per_sec': statuses[200] / elapsed,
+        'p95_ms': p95,
+        'statuses': dict(statuses)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='PASSWORD_POOL_WORKERS, 0 - хеширование в потоке запроса')
+    parser.add_argument('--queue', type=int, default=0, help='PASSWORD_POOL_QUEUE, по умолчанию 4 * workers')
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS)
+    args = parser.parse_args()
+
+    print(f"{'метод':<24} {'вход/с':>8} {'p95, мс':>9}  статусы")
+    for method in args.methods:
+        result = bench_method(method, args)
+        print(f"{result['method']:<24} {result['ok_per_sec']:>8.1f} {result['p95_ms']:>9.1f}  {result['statuses']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Бенчмарк накладных расходов ограничителя частоты запросов (ratelimit.py).
+
+Запуск: python bench_ratelimit.py [--requests 5000] [--keys 200000] [--max-keys 100000]
+1. MemoryBackend.consume() напрямую: --keys разных IP по кругу, при --keys > --max-keys
+   каждый вызов вытесняет старую корзину (худший случай для LRU).
+2. Пустой обработчик через test client с декоратором rate_limited и без него -
+   разница и есть цена ограничителя на запрос.
+3. POST /api/complaints с ограничителем и без (лимит заведомо не достигается,
+   у каждого запроса свой IP клиента).
+"""
+import argparse
+import statistics
+import time
+
+from bench_app import bench_app
+from ratelimit import Limit, MemoryBackend, rate_limited
+from routes import get_client_ip
+
+HIGH_LIMIT = '1000000/second'
+
+
+def bench_backend(args):
+    backend = MemoryBackend(args.max_keys)
+    limit = Limit(10, 10 / 60)
+    keys = [f'complaints:10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}' for i in range(args.keys)]
+
+    started = time.perf_counter()
+    now = time.monotonic()
+    for key in keys:
+        backend.consume(key, limit, now)
+    elapsed = time.perf_counter() - started
+    return elapsed / len(keys) * 1e6, len(backend)
+
+
+def median_ms(client, path, method, args, body=None):
+    durations = []
+    for i in range(args.requests):
+        environ = {'REMOTE_ADDR': f'10.1.{i >> 8 & 255}.{i & 255}'}
+        started = time.perf_counter()
+        response = client.open(path, method=method, json=body, environ_base=environ)
+        durations.append(time.perf_counter() - started)
+        assert response.status_code < 400, response.status_code
+    return statistics.median(durations) * 1000
+
+
+def bench_requests(args):
+    with bench_app({'RATE_LIMITS': {'complaints': HIGH_LIMIT, 'feedback': HIGH_LIMIT, 'bench': HIGH_LIMIT}}) as app:
+        app.add_url_rule('/bench/plain', 'bench_plain', lambda: ('', 204))
+        app.add_url_rule('/bench/limited', 'bench_limited', rate_limited('bench', get_client_ip)(lambda: ('', 204)))
+        client = app.test_client()
+
+        results = {
+            'пустой обработчик без лимита': median_ms(client, '/bench/plain', 'GET', args),
+            'пустой обработчик с лимитом': median_ms(client, '/bench/limited', 'GET', args)
+        }
+        body = {'complaint_text': 'Нагрузочный тест'}
+        app.config['RATE_LIMIT_ENABLED'] = False
+        results['POST /api/complaints без лимита'] = median_ms(client, '/api/complaints', 'POST', args, body)
+        app.config['RATE_LIMIT_ENABLED'] = True
+        results['POST /api/complaints с лимитом'] = median_ms(client, '/api/complaints', 'POST', args, body)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--keys', type=int, default=200000)
+    parser.add_argument('--max-keys', type=int, default=100000)
+    args = parser.parse_args()
+
+    per_call_us, size = bench_backend(args)
+    print(f'MemoryBackend.consume: {per_call_us:.2f} мкс на вызов, корзин в памяти: {size}')
+
+    results = bench_requests(args)
+    for name, value in results.items():
+        print(f'{name:<36} медиана {value:.3f} мс')
+    overhead = results['пустой обработчик с лимитом'] - results['пустой обработчик без лимита']
+    print(f'\nЦена ограничителя на запрос: {overhead * 1000:.1f} мкс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,433 @@
+"""Нагрузочный регрессионный прогон всех маршрутов через test client.
+
+Запуск: python bench_routes.py [--students 2000] [--complaints 20000] [--requests 200] [--threads 8] [--runs 5]
+        python bench_routes.py --update-baseline     # сохранить результаты как эталон
+        python bench_routes.py --only complaints     # только сценарии с этим словом в имени
+Приложение поднимается на временной SQLite БД (миграции, FTS, сводки), наполняется
+заданными объемами студентов, портфолио, оценок, жалоб и обратной связи. Каждый
+сценарий сначала прогревается --warmup запросами (не учитываются), затем выполняется
+--runs раз по --requests запросов в --threads потоков. Перед каждым сценарием фоновые
+записи дописываются, WAL сбрасывается в БД и собирается мусор. Печатаются медианы по
+прогонам для p50/p95/p99, процессорного времени запроса (не зависит от очереди потоков)
+и числа SQL-запросов на запрос (из заголовка Server-Timing).
+Потоковые ответы (выгрузки, архивы портфолио) дочитываются до конца, выгрузка берется за одни сутки.
+
+Сравнение с эталоном (bench_baseline.json): ошибка, если p50 или p95 больше эталонного
+в --tolerance раз (по умолчанию в 2) и сверх --slack-ms плюс интервал переключения GIL.
+К допуску p95 добавляется еще разброс p95 между прогонами: на одном ядре с --threads
+потоками p95 шумит сильнее медианы. Ошибка и тогда, когда SQL-запросов на запрос стало больше.
+Записывающие сценарии (POST/PUT/DELETE) зависят от блокировок SQLite и
+разброс у них больше: для них --write-tolerance и --write-slack-ms. Эталон, снятый с
+другими объемами, сравнивать нельзя - это тоже ошибка. Код выхода 1 при регрессии или
+неожиданных статусах ответов.
+"""
+import argparse
+import gc
+import hashlib
+import io
+import itertools
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import decode_token
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from auth import create_user_token, create_user_refresh_token
+from bench_app import bench_app, stop_background
+from extensions import db
+from models import User, Student, Group, Grade, PortfolioFile, Complaint, Feedback
+from revocation import revoke_tokens
+from storage import get_storage
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+SEED_ARGS = ('students', 'portfolio', 'grades', 'complaints', 'feedback')
+# Параметры, с которыми снят эталон: при других значениях цифры несравнимы
+VOLUME_ARGS = SEED_ARGS + ('requests', 'threads', 'runs')
+WRITE_METHODS = {'POST', 'PUT', 'DELETE'}
+PASSWORD = 'bench-password'
+HASH_METHOD = 'pbkdf2:sha256:1000'
+BLOB = b'%PDF-1.4 bench portfolio file\n' * 64
+WORDS = ['столовая', 'общежитие', 'расписание', 'библиотека', 'спортзал', 'преподаватель', 'стипендия', 'практика']
+SUBJECTS = ['Математика', 'Физика', 'История', 'Информатика', 'Английский язык']
+
+
+def seed(args, rng):
+    """Наполняет БД пачками через executemany, возвращает данные для сценариев"""
+    now = datetime.utcnow()
+    groups = [{'name': f'ГР-{number:03d}', 'course': number % 4 + 1} for number in range(20)]
+    group_ids = [row.id for row in db.session.execute(insert(Group).returning(Group.id), groups)]
+
+    pwhash = generate_password_hash(PASSWORD, HASH_METHOD)
+    admin = User(email='admin@bench.ru', role='admin', password_hash=pwhash)
+    teacher = User(email='teacher@bench.ru', role='teacher', password_hash=pwhash)
+    db.session.add_all([admin, teacher])
+    user_ids = [row.id for row in db.session.execute(
+        insert(User).returning(User.id, sort_by_parameter_order=True),
+        [{'email': f'student{i}@bench.ru', 'password_hash': pwhash, 'role': 'student'} for i in range(args.students)]
+    )]
+    student_ids = [row.id for row in db.session.execute(
+        insert(Student).returning(Student.id, sort_by_parameter_order=True),
+        [{'user_id': user_id, 'full_name': f'Студент {i}', 'group_id': group_ids[i % len(group_ids)]}
+         for i, user_id in enumerate(user_ids)]
+    )]
+
+    # Все файлы портфолио ссылаются на один блоб (хранение по хешу)
+    sha256 = hashlib.sha256(BLOB).hexdigest()
+    storage = get_storage()
+    blob_tmp = os.path.join(storage.tmp_dir, 'seed')
+    with open(blob_tmp, 'wb') as blob:
+        blob.write(BLOB)
+    storage.save(sha256, blob_tmp)
+    portfolio = [{'filename': f'doc{n}.pdf', 'saved_filename': sha256, 'file_size': len(BLOB), 'student_id': student_id}
+                 for student_id in student_ids for n in range(args.portfolio)]
+    # Отдельные файлы первого студента для сценария удаления (прогрев и все прогоны)
+    portfolio += [{'filename': 'delete.pdf', 'saved_filename': sha256, 'file_size': len(BLOB), 'student_id': student_ids[0]}
+                  for _ in range(args.warmup + args.requests * args.runs)]
+    for start in range(0, len(portfolio), 5000):
+        db.session.execute(insert(PortfolioFile), portfolio[start:start + 5000])
+    deletable = [file_id for (file_id,) in db.session.query(PortfolioFile.id).filter_by(filename='delete.pdf')]
+
+    grades = [{'student_id': student_id, 'subject': rng.choice(SUBJECTS), 'grade': rng.randint(2, 5),
+               'date': (now - timedelta(days=rng.randint(0, 180))).date()}
+              for student_id in student_ids for _ in range(args.grades)]
+    for start in range(0, len(grades), 5000):
+        db.session.execute(insert(Grade), grades[start:start + 5000])
+
+    def text():
+        return ' '.join(rng.choice(WORDS) for _ in range(8))
+
+    def created_at():
+        return now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+
+    complaints = [{'ip_address': '10.0.0.1', 'user_agent': 'bench', 'complaint_text': text(),
+                   'created_at': created_at(), 'public_id': str(uuid.uuid4())} for _ in range(args.complaints)]
+    feedback = [{'name': f'Гость {i}', 'email': f'guest{i}@mail.ru', 'message': text(),
+                 'ip_address': '10.0.0.1', 'user_agent': 'bench', 'created_at': created_at(),
+                 'public_id': str(uuid.uuid4())} for i in range(args.feedback)]
+    for model, rows in ((Complaint, complaints), (Feedback, feedback)):
+        for start in range(0, len(rows), 5000):
+            db.session.execute(insert(model), rows[start:start + 5000])
+    db.session.commit()
+
+    from stats import rebuild_rollup
+    from grades import rebuild_summary
+    rebuild_rollup()
+    rebuild_summary()
+
+    students = db.session.query(User, Student).join(Student, Student.user_id == User.id).limit(100).all()
+    # Выход отзывает токены, поэтому каждому запросу сценария выхода - своя пара
+    logout_tokens = [(create_user_token(user, student.id), create_user_refresh_token(user))
+                     for user, student in itertools.islice(itertools.cycle(students), args.warmup + args.requests * args.runs)]
+    user, student = students[-1]
+    revoked = create_user_token(user, student.id)
+    revoke_tokens([decode_token(revoked)])
+    db.session.commit()
+    return {
+        'admin': create_user_token(admin),
+        'teacher': create_user_token(teacher),
+        'students': [(user.email, student.id, create_user_token(user, student.id)) for user, student in students],
+        'refresh_tokens': [create_user_refresh_token(user) for user, _ in students],
+        'logout_tokens': logout_tokens,
+        'revoked': revoked,
+        'group_ids': group_ids,
+        'deletable': deletable
+    }
+
+
+def read_all(response):
+    """Дочитывает потоковый ответ: без этого замер покрывает только заголовки"""
+    response.get_data()
+    return response
+
+
+def scenarios(data):
+    """Имя -> (функция(client, i) -> response, ожидаемый статус)"""
+    admin = {'Authorization': f"Bearer {data['admin']}"}
+    teacher = {'Authorization': f"Bearer {data['teacher']}"}
+    students = data['students']
+    deletable = iter(data['deletable'])
+    logout_tokens = iter(data['logout_tokens'])
+    counter = itertools.count()
+    # Выгрузка за одни полные сутки (около 1/30 записей): полная выгрузка по --requests раз заняла бы десятки минут
+    day = (datetime.utcnow() - timedelta(days=7)).date().isoformat()
+    period = f'from={day}&to={day}'
+
+    def student(i):
+        return {'Authorization': f'Bearer {students[i % len(students)][2]}'}
+
+    def student_id(i):
+        return students[i % len(students)][1]
+
+    def logout(c):
+        access, refresh = next(logout_tokens)
+        return c.post('/api/logout', headers={'Authorization': f'Bearer {access}'}, json={'refresh_token': refresh})
+
+    def import_csv(i):
+        batch = next(counter)
+        rows = '\n'.join(f'import{batch}-{n}@bench.ru,{PASSWORD},Импорт {n},+70000000000,2005-01-01,ГР-001'
+                         for n in range(10))
+        return 'email,password,full_name,phone,birth_date,group\n' + rows
+
+    return {
+        # auth_routes
+        'auth: POST /api/login': (lambda c, i: c.post('/api/login', json={'email': students[i % len(students)][0], 'password': PASSWORD}), 200),
+        'auth: POST /api/register': (lambda c, i: c.post('/api/register', json={
+            'email': f'new{next(counter)}@bench.ru', 'password': PASSWORD, 'full_name': 'Новый студент',
+            'phone': '+70000000000', 'birth_date': '2005-01-01', 'group': 'ГР-002'}), 201),
+        'auth: GET /': (lambda c, i: c.get('/'), 200),
+        'auth: GET /api/': (lambda c, i: c.get('/api/'), 200),
+        'auth: GET /api/groups': (lambda c, i: c.get('/api/groups'), 200),
+        'auth: GET /api/check-token': (lambda c, i: c.get('/api/check-token', headers=student(i)), 200),
+        'auth: POST /api/refresh': (lambda c, i: c.post('/api/refresh', headers={
+            'Authorization': f"Bearer {data['refresh_tokens'][i % len(data['refresh_tokens'])]}"}), 200),
+        'auth: POST /api/logout': (lambda c, i: logout(c), 200),
+        'auth: GET profile отозванным токеном': (lambda c, i: c.get('/api/students/profile', headers={
+            'Authorization': f"Bearer {data['revoked']}"}), 401),
+        'auth: POST /api/debug-token': (lambda c, i: c.post('/api/debug-token', json={'token': students[i % len(students)][2]}), 200),
+        'auth: GET /api/metrics': (lambda c, i: c.get('/api/metrics', headers=admin), 200),
+        # student_routes
+        'students: GET profile': (lambda c, i: c.get('/api/students/profile', headers=student(i)), 200),
+        'students: GET portfolio': (lambda c, i: c.get('/api/students/portfolio', headers=student(i)), 200),
+        'students: POST portfolio': (lambda c, i: c.post('/api/students/portfolio', headers=student(i), content_type='multipart/form-data',
+                                                         data={'file': (io.BytesIO(BLOB), 'upload.pdf')}), 201),
+        'students: POST portfolio (10 файлов)': (lambda c, i: c.post('/api/students/portfolio', headers=student(i), content_type='multipart/form-data',
+                                                                     data={'file': [(io.BytesIO(BLOB), f'upload{n}.pdf') for n in range(10)]}), 201),
+        'students: GET portfolio download': (lambda c, i: c.get(f"/api/students/portfolio/{data['deletable'][-1]}/download",
+                                                                headers=student(0)), 200),
+        # Студент 0 хранит файлы для сценария удаления, архивы берутся у остальных
+        'students: GET portfolio archive': (lambda c, i: read_all(c.get('/api/students/portfolio/archive', headers=student(i + 1))), 200),
+        'students: GET archive куратором': (lambda c, i: read_all(c.get(f'/api/students/{student_id(i + 1)}/portfolio/archive',
+                                                                                 headers=teacher)), 200),
+        'students: DELETE portfolio': (lambda c, i: c.delete(f'/api/students/portfolio/{next(deletable)}', headers=student(0)), 200),
+        'students: POST admin import (10 строк)': (lambda c, i: c.post('/api/admin/students/import', headers=admin,
+                                                                        data=import_csv(i), content_type='text/csv'), 200),
+        # complaint_routes
+        'complaints: POST': (lambda c, i: c.post('/api/complaints', json={'complaint_text': 'Нагрузочный тест столовая'}), 201),
+        'complaints: GET список': (lambda c, i: c.get('/api/complaints?limit=50', headers=admin), 200),
+        'complaints: GET поиск': (lambda c, i: c.get(f'/api/complaints/search?q={WORDS[i % len(WORDS)]}&limit=20', headers=admin), 200),
+        'complaints: GET stats': (lambda c, i: c.get('/api/complaints/stats?window=7d&series=day', headers=admin), 200),
+        'complaints: GET export': (lambda c, i: read_all(c.get(f'/api/complaints/export?{period}', headers=admin)), 200),
+        'complaints: GET export gzip': (lambda c, i: read_all(c.get(f'/api/complaints/export?{period}&gzip=1', headers=admin)), 200),
+        # feedback_routes
+        'feedback: POST': (lambda c, i: c.post('/api/feedback', json={'name': 'Гость', 'email': 'guest@mail.ru', 'message': 'Спасибо'}), 201),
+        'feedback: GET список': (lambda c, i: c.get('/api/feedback?limit=50', headers=admin), 200),
+        'feedback: GET поиск': (lambda c, i: c.get(f'/api/feedback/search?q={WORDS[i % len(WORDS)]}&limit=20', headers=admin), 200),
+        'feedback: GET stats': (lambda c, i: c.get('/api/feedback/stats?window=7d', headers=admin), 200),
+        'feedback: GET export': (lambda c, i: read_all(c.get(f'/api/feedback/export?{period}', headers=admin)), 200),
+        'feedback: GET export gzip': (lambda c, i: read_all(c.get(f'/api/feedback/export?{period}&gzip=1', headers=admin)), 200),
+        # grade_routes
+        'grades: POST (20 оценок)': (lambda c, i: c.post('/api/grades', headers=teacher, json={'grades': [
+            {'student_id': student_id(i + n), 'subject': SUBJECTS[n % len(SUBJECTS)], 'grade': 4} for n in range(20)]}), 201),
+        'grades: GET оценки студента': (lambda c, i: c.get(f'/api/students/{student_id(i)}/grades?limit=20', headers=student(i)), 200),
+        'grades: GET сводка студента': (lambda c, i: c.get(f'/api/students/{student_id(i)}/grades/summary', headers=teacher), 200),
+        'grades: GET сводка группы': (lambda c, i: c.get(f"/api/groups/{data['group_ids'][i % len(data['group_ids'])]}/grades/summary",
+                                                         headers=teacher), 200),
+        'grades: GET сводка группы за период': (lambda c, i: c.get(f"/api/groups/{data['group_ids'][0]}/grades/summary?from=2000-01-01",
+                                                                   headers=teacher), 200),
+        'grades: GET сравнение групп': (lambda c, i: c.get('/api/grades/summary/groups', headers=teacher), 200),
+    }
+
+
+def warm_up(app, data):
+    """Прогревает кэши claims, профилей и групп, чтобы число SQL не зависело от --only"""
+    client = app.test_client()
+    client.get('/api/groups')
+    client.get('/api/complaints?limit=1', headers={'Authorization': f"Bearer {data['admin']}"})
+    client.get('/api/grades/summary/groups', headers={'Authorization': f"Bearer {data['teacher']}"})
+    for _, _, token in data['students']:
+        client.get('/api/students/profile', headers={'Authorization': f'Bearer {token}'})
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_scenario(app, call, expected, args, requests):
+    def one(i):
+        client = app.test_client()
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        response = call(client, i)
+        cpu = time.thread_time() - cpu_started
+        duration = time.perf_counter() - started
+        match = re.search(r'desc="(\d+) queries"', response.headers.get('Server-Timing', ''))
+        response.close()
+        return response.status_code, duration, cpu, int(match.group(1)) if match else None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        results = list(executor.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    durations = sorted(duration for _, duration, _, _ in results)
+    queries = [count for _, _, _, count in results if count is not None]
+    return {
+        'p50_ms': round(percentile(durations, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(durations, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(durations, 0.99) * 1000, 2),
+        'cpu_ms': round(statistics.median(cpu for _, _, cpu, _ in results) * 1000, 3),
+        'rps': round(len(results) / elapsed, 1),
+        'queries': round(sum(queries) / len(queries), 2) if queries else None,
+        'unexpected': Counter(status for status, _, _, _ in results if status != expected)
+    }
+
+
+def settle(app):
+    """Пауза между сценариями: фоновые записи дописаны, WAL сброшен в БД, мусор собран"""
+    stop_background(app)
+    with app.app_context():
+        db.session.execute(db.text('PRAGMA wal_checkpoint(TRUNCATE)'))
+        db.session.remove()
+    gc.collect()
+
+
+def measure(app, call, expected, args):
+    """Прогрев и --runs прогонов сценария; метрики - медианы по прогонам"""
+    settle(app)
+    warm = run_scenario(app, call, expected, args, args.warmup) if args.warmup else {'unexpected': Counter()}
+    runs = [run_scenario(app, call, expected, args, args.requests) for _ in range(args.runs)]
+    result = {key: round(statistics.median(run[key] for run in runs), 3 if key == 'cpu_ms' else 2)
+              for key in ('p50_ms', 'p95_ms', 'p99_ms', 'cpu_ms', 'rps')}
+    # Разброс p95 между прогонами: насколько p95 шумит на этой машине
+    result['p95_spread_ms'] = round(max(run['p95_ms'] for run in runs) - min(run['p95_ms'] for run in runs), 2)
+    queries = [run['queries'] for run in runs if run['queries'] is not None]
+    result['queries'] = round(statistics.median(queries), 2) if queries else None
+    unexpected = sum((run['unexpected'] for run in runs), warm['unexpected'])
+    result['unexpected'] = dict(unexpected)
+    return result
+
+
+def is_write(name):
+    return any(word in WRITE_METHODS for word in name.split())
+
+
+def compare(name, result, baseline, args):
+    """Список описаний регрессий сценария относительно эталона.
+
+    Главная проверка - p50: при --threads потоках на малом числе ядер p95 зависит от того,
+    в какую очередь за GIL и блокировкой SQLite попал запрос. Поэтому к допуску p95
+    добавляется шум: интервал переключения GIL и разброс p95 между прогонами (в эталоне или сейчас).
+    """
+    problems = []
+    if result['unexpected']:
+        problems.append(f"ответы с неожиданным статусом (статус: число) {result['unexpected']}")
+    if baseline is None:
+        return problems
+    if is_write(name):
+        tolerance, slack_ms = args.write_tolerance, args.write_slack_ms
+    else:
+        tolerance, slack_ms = args.tolerance, args.slack_ms
+    switch_ms = sys.getswitchinterval() * 1000
+
+    limit = max(baseline['p50_ms'] * tolerance, baseline['p50_ms'] + slack_ms + switch_ms)
+    if result['p50_ms'] > limit:
+        problems.append(f"p50 {result['p50_ms']} мс > {limit:.2f} мс (эталон {baseline['p50_ms']} мс)")
+    spread_ms = max(baseline.get('p95_spread_ms', 0), result['p95_spread_ms'])
+    limit = max(baseline['p95_ms'] * tolerance, baseline['p95_ms'] + slack_ms + switch_ms + spread_ms)
+    if result['p95_ms'] > limit:
+        problems.append(f"p95 {result['p95_ms']} мс > {limit:.2f} мс (эталон {baseline['p95_ms']} мс, разброс {spread_ms} мс)")
+    if result['queries'] is not None and baseline.get('queries') is not None and result['queries'] > baseline['queries'] + 0.01:
+        problems.append(f"SQL на запрос {result['queries']} > {baseline['queries']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--portfolio', type=int, default=3, help='файлов портфолио на студента')
+    parser.add_argument('--grades', type=int, default=20, help='оценок на студента')
+    parser.add_argument('--complaints', type=int, default=20000)
+    parser.add_argument('--feedback', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=200, help='запросов на сценарий в одном прогоне')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--runs', type=int, default=5, help='прогонов на сценарий, берется медиана')
+    parser.add_argument('--warmup', type=int, default=20, help='запросов прогрева перед прогонами')
+    parser.add_argument('--only', help='только сценарии, в имени которых есть эта строка')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=2.0, help='допустимый рост p50 и p95 (во сколько раз)')
+    parser.add_argument('--slack-ms', type=float, default=2.0, help='допустимый рост p50 и p95 в мс для быстрых сценариев')
+    parser.add_argument('--write-tolerance', type=float, default=3.0, help='допустимый рост p50 и p95 записывающих сценариев')
+    parser.add_argument('--write-slack-ms', type=float, default=20.0, help='допустимый рост p50 и p95 записывающих сценариев в мс')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            stored = json.load(f)
+        volumes = {name: getattr(args, name) for name in VOLUME_ARGS}
+        if stored.get('volumes') != volumes:
+            print(f"❌ Эталон снят с объемами {stored.get('volumes')}, текущие {volumes}: сравнение невозможно.\n"
+                  f"   Запустите с объемами эталона или пересохраните его флагом --update-baseline")
+            return 1
+        baseline = stored['scenarios']
+
+    with bench_app({
+        'PASSWORD_HASH_METHOD': HASH_METHOD,
+        'PASSWORD_POOL_WORKERS': 0,
+        'RATE_LIMIT_ENABLED': False,
+        # Жалобы пишутся в запросе, без фонового потока дозаписи
+        'INGEST_MODE': 'sync',
+        # Задачи обработки загрузок копятся в таблице и не отнимают CPU у замеров
+        'JOBS_WORKERS': 0,
+        # Кэши не должны истекать посреди прогона
+        'JWT_CLAIMS_CHECK_TTL': 3600,
+        'PROFILE_CACHE_TTL': 3600,
+        'GROUPS_CACHE_TTL': 3600,
+        'METRICS_ENABLED': True,
+        'SERVER_TIMING_ENABLED': True
+    }) as app:
+        started = time.perf_counter()
+        with app.app_context():
+            data = seed(args, random.Random(args.seed))
+        warm_up(app, data)
+        print(f'Данные созданы за {time.perf_counter() - started:.1f} с')
+
+        print(f"\n{'сценарий':<42} {'p50':>8} {'p95':>8} {'p99':>8} {'CPU':>8} {'req/s':>8} {'SQL':>6}")
+        results = {}
+        failed = {}
+        for name, (call, expected) in scenarios(data).items():
+            if args.only and args.only not in name:
+                continue
+            result = measure(app, call, expected, args)
+            results[name] = result
+            problems = compare(name, result, baseline.get(name), args)
+            if problems:
+                failed[name] = problems
+            queries = '-' if result['queries'] is None else f"{result['queries']:g}"
+            print(f"{'❌' if problems else '✅'} {name:<40} {result['p50_ms']:>6.2f}мс {result['p95_ms']:>6.2f}мс "
+                  f"{result['p99_ms']:>6.2f}мс {result['cpu_ms']:>6.2f}мс {result['rps']:>8.1f} {queries:>6}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'volumes': {name: getattr(args, name) for name in VOLUME_ARGS},
+                'scenarios': results
+            }, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'\nЭталон сохранен в {args.baseline}')
+        return 0
+
+    if failed:
+        print('\nРегрессии:')
+        for name, problems in failed.items():
+            for problem in problems:
+                print(f'  {name}: {problem}')
+        return 1
+    print('\nРегрессий нет' if baseline else '\nЭталона нет: сохраните его флагом --update-baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
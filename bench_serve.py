@@ -0,0 +1,104 @@
+"""Нагрузочный тест запущенного сервера по HTTP.
+
+Запуск: python bench_serve.py [--url http://127.0.0.1:5000] [--threads 32] [--duration 20]
+Перед тестом регистрируется студент (для /api/students/profile), затем потоки
+в течение --duration секунд по кругу обращаются к существующим эндпоинтам.
+Сравнивать число воркеров удобно так:
+    RATE_LIMIT_ENABLED=false GUNICORN_WORKERS=1 gunicorn -c gunicorn.conf.py wsgi:app
+    python bench_serve.py
+и то же самое с GUNICORN_WORKERS=2, 4, ...
+Без RATE_LIMIT_ENABLED=false POST /api/complaints с одного IP почти сразу получает 429.
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+
+
+def request(url, method='GET', body=None, token=None):
+    headers = {'Content-Type': 'application/json', 'User-Agent': 'bench_serve'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def register_student(base_url):
+    status, body = request(f'{base_url}/api/register', 'POST', {
+        'email': f'bench-{uuid.uuid4().hex[:8]}@college.ru',
+        'password': 'bench-password',
+        'full_name': 'Нагрузочный Тест',
+        'phone': '+70000000000',
+        'birth_date': '2005-01-01',
+        'group': 'ТМ-1417'
+    })
+    if status != 201:
+        raise SystemExit(f'Регистрация не удалась: {status} {body[:200]}')
+    return json.loads(body)['token']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20)
+    args = parser.parse_args()
+
+    token = register_student(args.url)
+    scenarios = [
+        ('GET /', lambda: request(f'{args.url}/')),
+        ('GET /api/groups', lambda: request(f'{args.url}/api/groups')),
+        ('GET /api/students/profile', lambda: request(f'{args.url}/api/students/profile', token=token)),
+        ('GET /api/students/portfolio', lambda: request(f'{args.url}/api/students/portfolio', token=token)),
+        ('POST /api/complaints', lambda: request(f'{args.url}/api/complaints', 'POST', {'complaint_text': 'Нагрузочный тест'}))
+    ]
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+
+    def worker(offset):
+        for name, call in itertools.islice(itertools.cycle(scenarios), offset, None):
+            if time.monotonic() >= deadline:
+                return
+            started = time.perf_counter()
+            status, _ = call()
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[name].append(elapsed)
+                if status >= 400:
+                    errors[name] += 1
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(i % len(scenarios),)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{'эндпоинт':<28} {'запросов':>9} {'p50, мс':>8} {'p95, мс':>8} {'ошибок':>7}")
+    for name, _ in scenarios:
+        values = sorted(latencies[name])
+        if not values:
+            continue
+        p50 = values[len(values) // 2] * 1000
+        p95 = values[int(len(values) * 0.95) - 1] * 1000
+        print(f"{name:<28} {len(values):>9} {p50:>8.1f} {p95:>8.1f} {errors[name]:>7}")
+    print(f"\nВсего: {total} запросов за {elapsed:.1f} с, {total / elapsed:.1f} req/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Бенчмарк смешанной нагрузки чтение/запись на SQLite с PRAGMA и без них.
+
+Запуск: python bench_sqlite.py [--requests 3000] [--threads 16] [--write-ratio 0.2]
+Для каждой конфигурации поднимается приложение на временной SQLite БД. Потоки
+выполняют через test client чтение (GET /api/complaints?limit=20 от админа) и запись
+(POST /api/complaints) в заданной пропорции. Ошибки 500 - это в основном
+"database is locked".
+"""
+import argparse
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from auth import create_user_token
+from bench_app import bench_app
+from extensions import db
+from models import User
+
+CONFIGS = {
+    'по умолчанию (rollback journal)': {},
+    'WAL + busy_timeout + NORMAL + mmap + cache': None  # None - PRAGMA из sqlite_pragmas()
+}
+
+
+def bench_config(name, pragmas, args):
+    config = {
+        'PASSWORD_POOL_WORKERS': 0,
+        'RATE_LIMIT_ENABLED': False
+    }
+    if pragmas is not None:
+        config['SQLITE_PRAGMAS'] = pragmas
+
+    with bench_app(config) as app:
+        with app.app_context():
+            admin = User(email='admin@college.ru', role='admin', password_hash='-')
+            db.session.add(admin)
+            db.session.commit()
+            token = create_user_token(admin)
+        headers = {'Authorization': f'Bearer {token}', 'User-Agent': 'bench'}
+
+        rng = random.Random(42)
+        operations = ['write' if rng.random() < args.write_ratio else 'read' for _ in range(args.requests)]
+
+        def run(operation):
+            client = app.test_client()
+            started = time.perf_counter()
+            if operation == 'write':
+                response = client.post('/api/complaints', json={'complaint_text': 'Нагрузочный тест'}, headers=headers)
+            else:
+                response = client.get('/api/complaints?limit=20', headers=headers)
+            return operation, response.status_code, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            results = list(executor.map(run, operations))
+        elapsed = time.perf_counter() - started
+
+    def p95(operation):
+        values = sorted(duration for op, _, duration in results if op == operation)
+        return values[int(len(values) * 0.95) - 1] * 1000 if values else 0
+
+    return {
+        'name': name,
+        'ops_per_sec': len(results) / elapsed,
+        'read_p95_ms': p95('read'),
+        'write_p95_ms': p95('write'),
+        'errors': sum(1 for _, status, _ in results if status >= 500),
+        'statuses': dict(Counter(status for _, status, _ in results))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(f"{'конфигурация':<44} {'оп/с':>7} {'p95 чтение':>11} {'p95 запись':>11} {'ошибок':>7}")
+    for name, pragmas in CONFIGS.items():
+        result = bench_config(name, pragmas, args)
+        print(f"{result['name']:<44} {result['ops_per_sec']:>7.1f} {result['read_p95_ms']:>9.1f}мс "
+              f"{result['write_p95_ms']:>9.1f}мс {result['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
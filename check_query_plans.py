@@ -0,0 +1,98 @@
+"""Проверка планов запросов: каждый запрос из routes.py должен идти по индексу.
+
+Запуск: python check_query_plans.py
+Скрипт поднимает приложение на временной SQLite БД, применяет миграции
+и прогоняет EXPLAIN QUERY PLAN для запросов горячих маршрутов.
+Код выхода 1, если хотя бы один запрос делает полный проход по таблице.
+"""
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+from app import create_app
+from commands import apply_migrations
+from extensions import db
+from models import User, Student, Group, Grade, PortfolioFile, Complaint, Feedback, Job, RevokedToken
+
+
+def route_queries():
+    """Запросы в том виде, в каком их строят обработчики"""
+    from routes import keyset_query
+    from stats import rollup_query
+    from profiles import profile_query
+    from grades import summary_query
+
+    week_ago = datetime.utcnow() - timedelta(days=7)
+    cursor = (datetime.utcnow(), 100)
+    grades = Grade.query.filter_by(student_id=1)
+    term_start = date.today() - timedelta(days=120)
+    return {
+        'login/register: User по email': User.query.filter_by(email='admin@college.ru'),
+        'student routes: Student по user_id': Student.query.filter_by(user_id=1),
+        'get_profile: student + user + group одним запросом': profile_query(1),
+        'register: Group по name': Group.query.filter_by(name='ТМ-1417'),
+        'get_portfolio_files: PortfolioFile по student_id': PortfolioFile.query.filter_by(student_id=1),
+        'download/delete: PortfolioFile по id и student_id': PortfolioFile.query.filter_by(id=1, student_id=1),
+        'delete_portfolio_file: ссылки на блоб': PortfolioFile.query.filter_by(saved_filename='0' * 64),
+        'get_all_complaints: первая страница': keyset_query(Complaint, None, 50),
+        'get_all_complaints: страница по курсору': keyset_query(Complaint, cursor, 50),
+        'get_all_feedback: первая страница': keyset_query(Feedback, None, 50),
+        'get_all_feedback: страница по курсору': keyset_query(Feedback, cursor, 50),
+        'get_complaints_stats: всего': rollup_query('complaints'),
+        'get_complaints_stats: за окно': rollup_query('complaints', week_ago),
+        'get_feedback_stats: за окно': rollup_query('feedback', week_ago),
+        'get_student_grades: первая страница': keyset_query(Grade, None, 50, column=Grade.date, query=grades),
+        'get_student_grades: страница по курсору': keyset_query(Grade, (date.today(), 100), 50, column=Grade.date, query=grades),
+        'get_student_grade_summary: из сводки': summary_query('subject', student_id=1),
+        'get_student_grade_summary: за период': summary_query('subject', student_id=1, date_from=term_start),
+        'get_group_grade_summary: из сводки': summary_query('subject', group_id=1),
+        'get_group_grade_summary: за период': summary_query('subject', group_id=1, date_from=term_start),
+        'claim_job: следующая готовая задача': Job.query.filter(Job.status == 'queued', Job.run_after <= datetime.utcnow()).order_by(Job.run_after, Job.id),
+        'requeue_stale: зависшие задачи': Job.query.filter(Job.status == 'running', Job.locked_at < week_ago),
+        'RevocationList.sync: новые отзывы': RevokedToken.query.filter(RevokedToken.revoked_at >= week_ago),
+        'RevocationList.sync: чистка истекших': RevokedToken.query.filter(RevokedToken.expires_at < week_ago),
+    }
+
+
+def explain(query):
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + compiled.string, params).all()
+    return [row[-1] for row in rows]
+
+
+def is_full_scan(detail):
+    if detail.startswith('SCAN ') and 'USING' not in detail:
+        return True
+    # Сортировка во временном B-дереве означает, что индекс для ORDER BY не подошёл.
+    # GROUP BY по уже отобранным по индексу строкам (сводки оценок) допустим
+    return 'TEMP B-TREE' in detail and 'GROUP BY' not in detail
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, 'plans.db')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database_path}'})
+
+        failed = []
+        with app.app_context():
+            apply_migrations()
+            for name, query in route_queries().items():
+                plan = explain(query)
+                bad = [detail for detail in plan if is_full_scan(detail)]
+                print(f"{'❌' if bad else '✅'} {name}: {'; '.join(plan)}")
+                if bad:
+                    failed.append(name)
+            db.engine.dispose()
+
+    if failed:
+        print(f"\nПолный проход по таблице в {len(failed)} запросах")
+        return 1
+    print("\nВсе запросы используют индексы")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
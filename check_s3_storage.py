@@ -0,0 +1,157 @@
+"""Проверка S3-хранилища портфолио на moto_server или MinIO.
+
+Запуск: moto_server -p 5000 &
+        AWS_ACCESS_KEY_ID=test AWS_SECRET_ACCESS_KEY=test python check_s3_storage.py --endpoint http://127.0.0.1:5000
+Нужен boto3 (pip install -r requirements-s3.txt). Скрипт создает бакет, если его нет,
+и проверяет методы S3Storage (save, open, exists, delete, url), а затем маршруты
+портфолио на временной SQLite БД: загрузку, скачивание редиректом на временную
+ссылку, ZIP-архив и удаление. Код выхода 1, если хотя бы одна проверка не прошла.
+"""
+import argparse
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import urllib.request
+import uuid
+import zipfile
+
+from auth import create_user_token
+from bench_app import bench_app
+from extensions import db
+from models import User, Student, Group
+from storage import BlobNotFound, S3Storage, get_storage
+
+BLOB = b'%PDF-1.4 s3 check\n' * 64
+
+
+def fetch(url):
+    """Тело и Content-Disposition ответа по ссылке (временная ссылка S3 не требует ключей)"""
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.read(), response.headers.get('Content-Disposition', '')
+
+
+def ensure_bucket(client, bucket, region):
+    try:
+        client.head_bucket(Bucket=bucket)
+    except client.exceptions.ClientError:
+        if region and region != 'us-east-1':
+            client.create_bucket(Bucket=bucket, CreateBucketConfiguration={'LocationConstraint': region})
+        else:
+            client.create_bucket(Bucket=bucket)
+
+
+def check_methods(storage, check):
+    # Имя уникально для прогона, чтобы не задеть блобы в общем бакете
+    blob_name = hashlib.sha256(BLOB + uuid.uuid4().bytes).hexdigest()
+    fd, tmp_path = tempfile.mkstemp(prefix='.upload-')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(BLOB)
+
+    storage.save(blob_name, tmp_path)
+    check('save: временный файл забран', not os.path.exists(tmp_path))
+    check('exists после save', storage.exists(blob_name))
+    body = storage.open(blob_name)
+    try:
+        check('open: содержимое совпадает', body.read() == BLOB)
+    finally:
+        body.close()
+
+    data, disposition = fetch(storage.url(blob_name, 'отчет.pdf'))
+    check('url: скачивание по временной ссылке', data == BLOB)
+    check('url: имя файла в Content-Disposition', "filename*=UTF-8''%D0%BE%D1%82%D1%87%D0%B5%D1%82.pdf" in disposition, disposition)
+
+    storage.delete(blob_name)
+    check('delete: блоба больше нет', not storage.exists(blob_name))
+    try:
+        storage.open(blob_name)
+        check('open удаленного блоба: BlobNotFound', False)
+    except BlobNotFound:
+        check('open удаленного блоба: BlobNotFound', True)
+    storage.delete(blob_name)
+    check('delete отсутствующего блоба - не ошибка', True)
+
+
+def create_student():
+    group = Group.query.first() or Group(name='ГР-S3', course=1)
+    user = User(email=f's3-{uuid.uuid4().hex[:8]}@check.ru', role='student', password_hash='-')
+    db.session.add_all([group, user])
+    db.session.flush()
+    student = Student(user_id=user.id, full_name='Проверка S3', group_id=group.id)
+    db.session.add(student)
+    db.session.commit()
+    return create_user_token(user, student.id)
+
+
+def check_routes(app, storage, token, check):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.post('/api/students/portfolio', headers=headers, content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(BLOB), 'report.pdf')})
+    check('POST portfolio: 201', response.status_code == 201, f'{response.status_code} {response.get_data(as_text=True)}')
+    if response.status_code != 201:
+        return
+    uploaded = response.get_json()
+    blob_name = hashlib.sha256(BLOB).hexdigest()
+    check('POST portfolio: блоб в бакете', storage.exists(blob_name))
+
+    response = client.get(f"/api/students/portfolio/{uploaded['id']}/download", headers=headers)
+    check('download: 302 на временную ссылку', response.status_code == 302, str(response.status_code))
+    if response.status_code == 302:
+        data, _ = fetch(response.headers['Location'])
+        check('download: содержимое по ссылке совпадает', data == BLOB)
+
+    response = client.get('/api/students/portfolio/archive', headers=headers)
+    archive = zipfile.ZipFile(io.BytesIO(response.get_data()))
+    check('archive: файл из S3 в ZIP', archive.read(archive.namelist()[0]) == BLOB, str(archive.namelist()))
+
+    response = client.delete(f"/api/students/portfolio/{uploaded['id']}", headers=headers)
+    check('DELETE portfolio: 200', response.status_code == 200, str(response.status_code))
+    check('DELETE portfolio: блоб удален из бакета', not storage.exists(blob_name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoint', default=os.getenv('PORTFOLIO_S3_ENDPOINT_URL'),
+                        help='moto_server или MinIO, по умолчанию PORTFOLIO_S3_ENDPOINT_URL')
+    parser.add_argument('--bucket', default=os.getenv('PORTFOLIO_S3_BUCKET', 'unost-check'))
+    parser.add_argument('--region', default=os.getenv('PORTFOLIO_S3_REGION', 'us-east-1'))
+    args = parser.parse_args()
+
+    failed = []
+
+    def check(name, ok, detail=''):
+        print(f"{'✅' if ok else '❌'} {name}" + (f' ({detail})' if detail and not ok else ''))
+        if not ok:
+            failed.append(name)
+
+    with bench_app({
+        'PORTFOLIO_STORAGE': 's3',
+        'PORTFOLIO_S3_BUCKET': args.bucket,
+        # Отдельный префикс на прогон: проверка не трогает чужие ключи
+        'PORTFOLIO_S3_PREFIX': f'check-{uuid.uuid4().hex[:8]}/',
+        'PORTFOLIO_S3_ENDPOINT_URL': args.endpoint,
+        'PORTFOLIO_S3_REGION': args.region,
+        'PASSWORD_POOL_WORKERS': 0,
+        'RATE_LIMIT_ENABLED': False,
+        'JOBS_WORKERS': 0
+    }) as app:
+        with app.app_context():
+            storage = get_storage()
+            assert isinstance(storage, S3Storage)
+            ensure_bucket(storage.client, args.bucket, args.region)
+            check_methods(storage, check)
+            token = create_student()
+        check_routes(app, storage, token, check)
+
+    if failed:
+        print(f'\n❌ Не прошло проверок: {len(failed)}')
+        return 1
+    print('\n✅ S3-хранилище работает')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
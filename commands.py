@@ -0,0 +1,172 @@
+import click
+from flask import g
+from flask_migrate import upgrade
+from extensions import db
+from models import User
+
+
+def apply_migrations():
+    """То же, что `flask db upgrade`, но из кода (run.py, проверки).
+
+    Flask-Migrate 4.0.6 читает g.x_arg, который заполняет только CLI.
+    """
+    g.x_arg = getattr(g, 'x_arg', [])
+    upgrade()
+
+
+def register_commands(app):
+    """Регистрирует служебные команды `flask ...`"""
+
+    @app.cli.command('set-role')
+    @click.argument('email')
+    @click.argument('role')
+    def set_role(email, role):
+        """Меняет роль пользователя и отзывает claims в его токенах"""
+        from auth import invalidate_claims
+
+        user = User.query.filter_by(email=email).first()
+        if not user:
+            raise click.ClickException(f'Пользователь {email} не найден')
+
+        user.role = role
+        invalidate_claims(user)
+        db.session.commit()
+        click.echo(f'✅ {email}: роль {role}, ранее выданные токены отозваны')
+
+    @app.cli.command('revoke-tokens')
+    @click.argument('email')
+    def revoke_user_tokens(email):
+        """Отзывает все выданные пользователю токены, включая refresh (например, при утечке пароля)"""
+        from auth import invalidate_claims
+
+        user = User.query.filter_by(email=email).first()
+        if not user:
+            raise click.ClickException(f'Пользователь {email} не найден')
+
+        invalidate_claims(user)
+        db.session.commit()
+        click.echo(f'✅ {email}: ранее выданные токены отозваны')
+
+    @app.cli.command('rollup-rebuild')
+    def rollup_rebuild():
+        """Пересчитывает почасовую статистику жалоб и обратной связи по существующим записям"""
+        from stats import rebuild_rollup
+
+        for source, total in rebuild_rollup().items():
+            click.echo(f'✅ {source}: {total} записей')
+
+    @app.cli.command('grades-rebuild')
+    def grades_rebuild():
+        """Пересчитывает сводку оценок (GradeSummary) по всем оценкам"""
+        from grades import rebuild_summary
+
+        click.echo(f'✅ Сводка оценок: {rebuild_summary()} строк студент-предмет')
+
+    @app.cli.command('search-rebuild')
+    def search_rebuild():
+        """Перестраивает полнотекстовый индекс жалоб и обратной связи (только SQLite)"""
+        from search import SearchUnavailable, rebuild_search_index
+
+        try:
+            result = rebuild_search_index()
+        except SearchUnavailable:
+            raise click.ClickException('Полнотекстовый поиск доступен только на SQLite')
+        for source, total in result.items():
+            click.echo(f'✅ {source}: {total} записей в индексе')
+
+    @app.cli.command('jobs-work')
+    @click.option('--threads', type=int, default=1, show_default=True)
+    @click.option('--burst', is_flag=True, help='Выполнить готовые задачи и выйти')
+    def jobs_work(threads, burst):
+        """Обработчик очереди фоновых задач отдельным процессом (при JOBS_WORKERS=0 в веб-процессах)"""
+        import signal
+        import threading
+        from flask import current_app
+        from jobs import JobQueue, requeue_stale, run_pending
+
+        if burst:
+            requeue_stale(current_app.config['JOBS_LOCK_TIMEOUT'])
+            click.echo(f'✅ Выполнено задач: {run_pending()}')
+            return
+
+        # По SIGTERM (systemd, docker stop) и Ctrl+C текущие задачи дорабатываются
+        stopped = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stopped.set())
+
+        job_queue = JobQueue(current_app._get_current_object(), threads)
+        click.echo(f'Обработчик очереди запущен, потоков: {threads}')
+        stopped.wait()
+        job_queue.close()
+        click.echo('Обработчик очереди остановлен')
+
+    @app.cli.command('jobs-retry')
+    def jobs_retry():
+        """Возвращает упавшие задачи (failed) в очередь с обнулением попыток"""
+        from jobs import retry_failed
+
+        click.echo(f'✅ Возвращено в очередь задач: {retry_failed()}')
+
+    @app.cli.command('ingest-replay')
+    def ingest_replay():
+        """Дописывает в БД жалобы и обратную связь из файла INGEST_DEAD_LETTER_PATH"""
+        from flask import current_app
+        from ingest import replay_dead_letter
+
+        path = current_app.config['INGEST_DEAD_LETTER_PATH']
+        saved, failed = replay_dead_letter(path, current_app.config['INGEST_BATCH_SIZE'])
+        click.echo(f'✅ Сохранено строк: {saved}')
+        if failed:
+            raise click.ClickException(f'Не сохранено строк: {failed}, они остались в {path}')
+
+    @app.cli.command('storage-migrate')
+    @click.option('--source', type=click.Path(exists=True, file_okay=False),
+                  help='Плоский каталог со старыми файлами, по умолчанию PORTFOLIO_STORAGE_ROOT')
+    @click.option('--dry-run', is_flag=True, help='Только посчитать, ничего не переносить')
+    def storage_migrate(source, dry_run):
+        """Переносит файлы портфолио из плоского каталога в подкаталоги ab/cd/ или в S3 без остановки приложения"""
+        from flask import current_app
+        from models import PortfolioFile
+        from storage import get_storage, migrate_blobs
+
+        source = source or current_app.config['PORTFOLIO_STORAGE_ROOT']
+        blob_names = (name for (name,) in db.session.query(PortfolioFile.saved_filename).distinct().yield_per(1000))
+        result = migrate_blobs(get_storage(), blob_names, source, dry_run=dry_run)
+        click.echo(
+            f"{'Проверка' if dry_run else '✅ Готово'}: перенесено {result['moved']}, скопировано {result['copied']}, "
+            f"уже на месте {result['skipped']}, не найдено {result['missing']}"
+        )
+
+    @app.cli.command('seed')
+    def seed():
+        """Создает тестового администратора и справочник групп, если их еще нет"""
+        from run import init_test_data
+
+        init_test_data()
+        db.session.commit()
+        click.echo('✅ Тестовые данные инициализированы')
+
+    @app.cli.command('import-students')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='По умолчанию - по расширению файла')
+    @click.option('--dry-run', is_flag=True, help='Только проверить файл, ничего не записывать')
+    def import_students_command(path, fmt, dry_run):
+        """Массовая регистрация студентов из CSV (с заголовком) или NDJSON"""
+        from importer import parse_rows, import_students
+
+        with open(path, encoding='utf-8-sig') as f:
+            text = f.read()
+        try:
+            rows = parse_rows(text, fmt or path.rsplit('.', 1)[-1].lower())
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+        report = import_students(rows, dry_run=dry_run)
+        for error in report['errors']:
+            click.echo(f"❌ строка {error['row']} ({error['email']}): {error['error']}")
+        if report['new_groups']:
+            click.echo(f"Новые группы: {', '.join(report['new_groups'])}")
+        if dry_run:
+            click.echo(f"Проверка: {report['valid']} из {report['total']} строк можно импортировать")
+        else:
+            click.echo(f"✅ Создано студентов: {report['created']} из {report['total']}")
@@ -0,0 +1,74 @@
+import os
+from sqlalchemy import event
+from extensions import db
+
+def resolve_database_url(basedir):
+    """DATABASE_URL из окружения с поправками под наши драйверы.
+
+    Относительный путь SQLite (как в README: sqlite:///instance/unost.db)
+    считается от папки проекта, а не от instance_path Flask. Для PostgreSQL
+    выбирается установленный драйвер psycopg 3.
+    """
+    url = os.getenv('DATABASE_URL')
+    if not url:
+        return f"sqlite:///{os.path.join(basedir, 'instance', 'unost.db')}"
+
+    if url.startswith('sqlite:///') and url != 'sqlite:///:memory:':
+        path = url[len('sqlite:///'):]
+        if not os.path.isabs(path):
+            url = f'sqlite:///{os.path.join(basedir, path)}'
+    elif url.startswith('postgres://'):
+        url = 'postgresql+psycopg://' + url[len('postgres://'):]
+    elif url.startswith('postgresql://'):
+        url = 'postgresql+psycopg://' + url[len('postgresql://'):]
+    return url
+
+def engine_options(url):
+    """Параметры пула для серверных СУБД; для SQLite оставляем пул по умолчанию"""
+    if url.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True
+    }
+
+def sqlite_pragmas():
+    """PRAGMA для каждого нового соединения SQLite.
+
+    WAL позволяет читателям не ждать писателя, busy_timeout заставляет писателей
+    ждать блокировку вместо мгновенного "database is locked", synchronous=NORMAL
+    в режиме WAL безопасен и убирает fsync на каждый коммит.
+    """
+    return {
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64 * 1024))  # в КиБ, 64 МБ
+    }
+
+def init_engine(app):
+    """Навешивает PRAGMA из SQLITE_PRAGMAS на подключения к SQLite"""
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+def dialect_insert(model):
+    """INSERT с поддержкой on_conflict_do_update для текущей СУБД (SQLite или PostgreSQL)"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, time, timedelta
+from stats import SOURCES
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+EXPORT_BATCH_SIZE = 1000
+# Сколько байт копить перед отправкой (и сжатием) очередного куска ответа
+EXPORT_CHUNK_SIZE = 64 * 1024
+# Ячейки, которые Excel принял бы за формулу
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def export_query(source, date_from=None, date_to=None):
+    """Записи источника по возрастанию created_at за период [date_from, date_to] (даты включительно)"""
+    model = SOURCES[source]
+    query = model.query.order_by(model.created_at, model.id)
+    if date_from is not None:
+        query = query.filter(model.created_at >= datetime.combine(date_from, time.min))
+    if date_to is not None:
+        query = query.filter(model.created_at < datetime.combine(date_to + timedelta(days=1), time.min))
+    # Строки читаются из курсора пачками, в памяти одновременно только одна пачка
+    return query.execution_options(stream_results=True).yield_per(EXPORT_BATCH_SIZE)
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def _rows(source, fmt, query):
+    """Строки выгрузки в выбранном формате; для CSV первой идет шапка с BOM для Excel"""
+    if fmt == 'ndjson':
+        for item in query:
+            yield json.dumps(item.to_dict(), ensure_ascii=False) + '\n'
+        return
+
+    columns = [column.name for column in SOURCES[source].__table__.columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield '\ufeff' + buffer.getvalue()
+    for item in query:
+        buffer.seek(0)
+        buffer.truncate()
+        row = item.to_dict()
+        writer.writerow([_csv_cell(row[column]) for column in columns])
+        yield buffer.getvalue()
+
+def export_stream(source, fmt, date_from=None, date_to=None, compress=False):
+    """Генератор байтов выгрузки.
+
+    Первая строка отправляется сразу, дальше куски по EXPORT_CHUNK_SIZE;
+    при compress - единый поток gzip.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    pending = []
+    size = 0
+    first = True
+    for text in _rows(source, fmt, export_query(source, date_from, date_to)):
+        data = text.encode('utf-8')
+        pending.append(data)
+        size += len(data)
+        if first or size >= EXPORT_CHUNK_SIZE:
+            chunk = b''.join(pending)
+            pending, size = [], 0
+            if compressor:
+                chunk = compressor.compress(chunk) + (compressor.flush(zlib.Z_SYNC_FLUSH) if first else b'')
+            first = False
+            if chunk:
+                yield chunk
+
+    chunk = b''.join(pending)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+def export_filename(source, fmt, date_from=None, date_to=None, compress=False):
+    period = '-'.join(day.strftime('%Y%m%d') for day in (date_from, date_to) if day is not None)
+    name = f'{source}-{period}' if period else source
+    return f"{name}.{fmt}{'.gz' if compress else ''}"
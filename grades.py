@@ -0,0 +1,166 @@
+from collections import Counter
+from datetime import date, datetime
+from sqlalchemy import case, func, insert, select
+from extensions import db
+from database import dialect_insert
+from models import Student, Grade, GradeSummary
+
+GRADE_VALUES = range(1, 6)
+MAX_GRADES_PER_REQUEST = 5000
+# Ограничение на число параметров в одном IN (...) для SQLite
+LOOKUP_CHUNK_SIZE = 500
+
+def parse_grade_date(value):
+    """'2024-09-01' -> date; ValueError для некорректной даты"""
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Некорректная дата {value!r}, нужен формат ГГГГ-ММ-ДД')
+
+def validate_grades(rows):
+    """Проверяет оценки из запроса -> (список строк для вставки, список ошибок).
+
+    Ошибки указываются по номерам строк (нумерация с 1).
+    """
+    if not isinstance(rows, list) or not rows:
+        return [], [{'row': None, 'error': 'Нужен непустой список оценок'}]
+    if len(rows) > MAX_GRADES_PER_REQUEST:
+        return [], [{'row': None, 'error': f'Не больше {MAX_GRADES_PER_REQUEST} оценок за запрос'}]
+
+    valid = []
+    errors = []
+    today = datetime.utcnow().date()
+    for number, raw in enumerate(rows, start=1):
+        if not isinstance(raw, dict):
+            errors.append({'row': number, 'error': 'Оценка должна быть объектом'})
+            continue
+
+        student_id = raw.get('student_id')
+        subject = raw.get('subject')
+        subject = subject.strip() if isinstance(subject, str) else ''
+        grade = raw.get('grade')
+        if not isinstance(student_id, int) or isinstance(student_id, bool):
+            errors.append({'row': number, 'error': 'student_id должен быть числом'})
+        elif not subject or len(subject) > 100:
+            errors.append({'row': number, 'error': 'Предмет обязателен, не длиннее 100 символов'})
+        elif not isinstance(grade, int) or isinstance(grade, bool) or grade not in GRADE_VALUES:
+            errors.append({'row': number, 'error': 'Оценка должна быть целым числом от 1 до 5'})
+        else:
+            try:
+                grade_date = parse_grade_date(raw['date']) if raw.get('date') else today
+            except ValueError as e:
+                errors.append({'row': number, 'error': str(e)})
+                continue
+            valid.append((number, {'student_id': student_id, 'subject': subject, 'grade': grade, 'date': grade_date}))
+
+    existing = set()
+    student_ids = sorted({row['student_id'] for _, row in valid})
+    for start in range(0, len(student_ids), LOOKUP_CHUNK_SIZE):
+        chunk = student_ids[start:start + LOOKUP_CHUNK_SIZE]
+        existing.update(student_id for (student_id,) in db.session.query(Student.id).filter(Student.id.in_(chunk)))
+
+    for number, row in valid:
+        if row['student_id'] not in existing:
+            errors.append({'row': number, 'error': f"Студент {row['student_id']} не найден"})
+    errors.sort(key=lambda error: error['row'])
+    return [row for _, row in valid], errors
+
+def bump_summary(rows):
+    """Добавляет оценки в GradeSummary в текущей транзакции (коммит делает вызывающий код)"""
+    totals = {}
+    for row in rows:
+        key = (row['student_id'], row['subject'])
+        totals.setdefault(key, Counter())[row['grade']] += 1
+    if not totals:
+        return
+
+    values = []
+    for (student_id, subject), counts in totals.items():
+        value = {
+            'student_id': student_id,
+            'subject': subject,
+            'grade_count': sum(counts.values()),
+            'grade_sum': sum(grade * count for grade, count in counts.items())
+        }
+        value.update({f'count_{grade}': counts.get(grade, 0) for grade in GRADE_VALUES})
+        values.append(value)
+
+    stmt = dialect_insert(GradeSummary).values(values)
+    columns = ['grade_count', 'grade_sum'] + [f'count_{grade}' for grade in GRADE_VALUES]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['student_id', 'subject'],
+        set_={column: GradeSummary.__table__.c[column] + stmt.excluded[column] for column in columns}
+    )
+    db.session.execute(stmt)
+
+def record_grades(rows):
+    """Записывает проверенные оценки одной пачкой вместе со сводкой, в одной транзакции"""
+    db.session.execute(insert(Grade), rows)
+    bump_summary(rows)
+    db.session.commit()
+    return len(rows)
+
+def _aggregate_columns(raw):
+    """count, sum и распределение: из сырых оценок (GROUP BY по Grade) или из сводки"""
+    if raw:
+        return [func.count(Grade.grade), func.coalesce(func.sum(Grade.grade), 0)] + [
+            func.sum(case((Grade.grade == grade, 1), else_=0)) for grade in GRADE_VALUES
+        ]
+    table = GradeSummary.__table__.c
+    return [func.sum(table.grade_count), func.sum(table.grade_sum)] + [
+        func.sum(table[f'count_{grade}']) for grade in GRADE_VALUES
+    ]
+
+def summary_query(by, student_id=None, group_id=None, date_from=None, date_to=None):
+    """Агрегат оценок по предмету (by='subject') или по группе (by='group').
+
+    Без периода читается GradeSummary (строк столько, сколько пар студент-предмет),
+    с периодом ?from/?to - оценки за период группируются в БД по индексу (student_id, date).
+    """
+    raw = date_from is not None or date_to is not None
+    source = Grade if raw else GradeSummary
+    key = source.subject if by == 'subject' else Student.group_id
+
+    query = db.session.query(key, *_aggregate_columns(raw)).select_from(source)
+    if by == 'group' or group_id is not None:
+        query = query.join(Student, Student.id == source.student_id)
+    if student_id is not None:
+        query = query.filter(source.student_id == student_id)
+    if group_id is not None:
+        query = query.filter(Student.group_id == group_id)
+    if date_from is not None:
+        query = query.filter(Grade.date >= date_from)
+    if date_to is not None:
+        query = query.filter(Grade.date <= date_to)
+    return query.group_by(key).order_by(key)
+
+def summary_row(count, total, *distribution):
+    count = count or 0
+    return {
+        'count': count,
+        'average': round(total / count, 2) if count else None,
+        'distribution': {str(grade): amount or 0 for grade, amount in zip(GRADE_VALUES, distribution)}
+    }
+
+def grade_summary(by, **filters):
+    """Список агрегатов с общим итогом по всем строкам"""
+    name = 'subject' if by == 'subject' else 'group_id'
+    items = []
+    overall = [0] * (2 + len(GRADE_VALUES))
+    for key, *values in summary_query(by, **filters):
+        items.append({name: key, **summary_row(*values)})
+        overall = [acc + (value or 0) for acc, value in zip(overall, values)]
+    return {'items': items, 'overall': summary_row(*overall)}
+
+def rebuild_summary():
+    """Пересчитывает GradeSummary по всем оценкам, возвращает число строк сводки"""
+    db.session.query(GradeSummary).delete()
+    rows = select(Grade.student_id, Grade.subject, *_aggregate_columns(raw=True)).where(
+        Grade.grade.between(1, 5)
+    ).group_by(Grade.student_id, Grade.subject)
+    db.session.execute(GradeSummary.__table__.insert().from_select(
+        ['student_id', 'subject', 'grade_count', 'grade_sum'] + [f'count_{grade}' for grade in GRADE_VALUES],
+        rows
+    ))
+    db.session.commit()
+    return db.session.query(func.count()).select_from(GradeSummary).scalar()
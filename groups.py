@@ -0,0 +1,81 @@
+import hashlib
+import json
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+from extensions import db
+from models import Group
+
+class GroupRegistry:
+    """Кэш справочника групп в памяти процесса: name <-> id.
+
+    Список групп почти не меняется, поэтому он целиком читается одним запросом
+    и сбрасывается при изменении групп в этом процессе. Изменения из других
+    процессов (воркеров gunicorn) видны не позже чем через ttl секунд. Промах по
+    имени перепроверяется в БД; неизвестный id перечитывает список один раз до
+    следующей загрузки.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._groups = None
+        self._by_name = {}
+        self._by_id = {}
+        self._missing_ids = set()
+        self._expires = 0
+        self.etag = None
+
+    def _load(self):
+        rows = db.session.query(Group.id, Group.name, Group.course).order_by(Group.name).all()
+        groups = [{'id': row.id, 'name': row.name, 'course': row.course} for row in rows]
+        with self._lock:
+            self._groups = groups
+            self._by_name = {group['name']: group['id'] for group in groups}
+            self._by_id = {group['id']: group['name'] for group in groups}
+            self._missing_ids = set()
+            self._expires = time.monotonic() + self.ttl
+            self.etag = hashlib.sha1(json.dumps(groups, ensure_ascii=False).encode()).hexdigest()
+
+    def _ensure_loaded(self):
+        if self._groups is None or time.monotonic() >= self._expires:
+            self._load()
+
+    def all(self):
+        self._ensure_loaded()
+        return self._groups
+
+    def id_for(self, name):
+        self._ensure_loaded()
+        group_id = self._by_name.get(name)
+        if group_id is None and db.session.query(Group.id).filter_by(name=name).first():
+            self._load()
+            group_id = self._by_name.get(name)
+        return group_id
+
+    def name_for(self, group_id):
+        if group_id is None:
+            return None
+        self._ensure_loaded()
+        if group_id not in self._by_id and group_id not in self._missing_ids:
+            self._load()
+            if group_id not in self._by_id:
+                self._missing_ids.add(group_id)
+        return self._by_id.get(group_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._groups = None
+
+def get_group_registry():
+    registry = current_app.extensions.get('group_registry')
+    if registry is None:
+        registry = current_app.extensions.setdefault('group_registry', GroupRegistry(current_app.config['GROUPS_CACHE_TTL']))
+    return registry
+
+@event.listens_for(Group, 'after_insert')
+@event.listens_for(Group, 'after_update')
+@event.listens_for(Group, 'after_delete')
+def _invalidate_group_registry(mapper, connection, target):
+    get_group_registry().invalidate()
@@ -0,0 +1,37 @@
+# Конфигурация gunicorn для продакшена: gunicorn -c gunicorn.conf.py wsgi:app
+# Все параметры можно переопределить переменными окружения GUNICORN_*
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Процессы и потоки: gthread держит несколько запросов на процесс,
+# пока один из них ждет БД или диск
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Приложение импортируется один раз в мастере, воркеры получают его через fork
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+# Keep-alive за прокси: соединение от nginx переиспользуется между запросами
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+# Время на завершение текущих запросов при перезапуске (HUP/TERM)
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Периодический перезапуск воркеров ограничивает рост памяти
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.getenv('GUNICORN_ERROR_LOG', '-')
+
+
+def post_fork(server, worker):
+    # Соединения с БД, открытые в мастере при preload, не должны делиться между процессами
+    from wsgi import app
+    from extensions import db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
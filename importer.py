@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+from sqlalchemy import insert
+from extensions import db
+from models import User, Student, Group
+from groups import get_group_registry
+from passwords import hash_passwords
+from registration import validate_registration
+
+IMPORT_BATCH_SIZE = 500
+# Ограничение на число параметров в одном IN (...) для SQLite
+LOOKUP_CHUNK_SIZE = 500
+
+def parse_rows(text, fmt):
+    """Строки CSV (с заголовком) или NDJSON -> список словарей"""
+    if fmt == 'csv':
+        return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+    if fmt == 'ndjson':
+        rows = []
+        for number, line in enumerate(text.splitlines(), start=1):
+            if line.strip():
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    raise ValueError(f'Строка {number}: некорректный JSON')
+        return rows
+    raise ValueError('Формат должен быть csv или ndjson')
+
+def _existing_emails(emails):
+    existing = set()
+    for start in range(0, len(emails), LOOKUP_CHUNK_SIZE):
+        chunk = emails[start:start + LOOKUP_CHUNK_SIZE]
+        existing.update(email for (email,) in db.session.query(User.email).filter(User.email.in_(chunk)))
+    return existing
+
+def _resolve_groups(names, dry_run):
+    """name -> id для всех групп файла; недостающие создаются одним flush"""
+    registry = get_group_registry()
+    group_ids = {name: registry.id_for(name) for name in names}
+    missing = [name for name, group_id in group_ids.items() if group_id is None]
+    if missing and not dry_run:
+        groups = [Group(name=name) for name in missing]
+        db.session.add_all(groups)
+        db.session.flush()
+        group_ids.update({group.name: group.id for group in groups})
+    return group_ids, missing
+
+def import_students(rows, dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+    """Массовая регистрация студентов.
+
+    Каждая строка проверяется так же, как в /api/register. Существующие email и группы
+    определяются одним проходом, пароли хешируются параллельно в пуле процессов,
+    пользователи и студенты вставляются пачками по batch_size с коммитом на пачку.
+    Возвращает отчет с ошибками по номерам строк (нумерация с 1).
+    """
+    errors = []
+    valid = []
+    seen_emails = set()
+    for number, raw in enumerate(rows, start=1):
+        # В NDJSON строка может оказаться корректным JSON, но не объектом
+        if not isinstance(raw, dict):
+            errors.append({'row': number, 'email': None, 'error': 'Строка должна быть JSON-объектом'})
+            continue
+        data, error = validate_registration(raw)
+        if not error and data['email'] in seen_emails:
+            error = 'Email повторяется в файле'
+        if error:
+            errors.append({'row': number, 'email': raw.get('email'), 'error': error})
+            continue
+        seen_emails.add(data['email'])
+        valid.append((number, data))
+
+    existing = _existing_emails([data['email'] for _, data in valid])
+    pending = []
+    for number, data in valid:
+        if data['email'] in existing:
+            errors.append({'row': number, 'email': data['email'], 'error': 'Пользователь с таким email уже существует'})
+        else:
+            pending.append((number, data))
+
+    group_ids, new_groups = _resolve_groups(sorted({data['group'] for _, data in pending}), dry_run)
+
+    created = 0
+    if not dry_run and pending:
+        db.session.commit()
+        hashes = hash_passwords([data['password'] for _, data in pending])
+
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            batch_hashes = hashes[start:start + batch_size]
+            try:
+                user_rows = db.session.execute(
+                    insert(User).returning(User.id, User.email, sort_by_parameter_order=True),
+                    [{'email': data['email'], 'password_hash': pwhash, 'role': 'student'}
+                     for (_, data), pwhash in zip(batch, batch_hashes)]
+                ).all()
+                db.session.execute(insert(Student), [
+                    {
+                        'user_id': user_id,
+                        'full_name': data['full_name'],
+                        'phone': data['phone'],
+                        'birth_date': data['birth_date'],
+                        'group_id': group_ids[data['group']]
+                    }
+                    for (user_id, _), (_, data) in zip(user_rows, batch)
+                ])
+                db.session.commit()
+                created += len(batch)
+            except Exception as e:
+                db.session.rollback()
+                errors.extend({'row': number, 'email': data['email'], 'error': f'Ошибка записи: {str(e)}'}
+                              for number, data in batch)
+    elif dry_run:
+        db.session.rollback()
+
+    errors.sort(key=lambda error: error['row'])
+    return {
+        'total': len(rows),
+        'valid': len(pending),
+        'created': created,
+        'new_groups': new_groups,
+        'errors': errors,
+        'dry_run': dry_run
+    }
@@ -0,0 +1,194 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import insert
+from extensions import db
+from stats import SOURCES, bump_rollup
+
+logger = logging.getLogger(__name__)
+
+class IngestQueueFull(Exception):
+    """Очередь отложенной записи заполнена"""
+
+class SubmissionWriter:
+    """Отложенная запись анонимных жалоб и обратной связи пачками.
+
+    Обработчик кладет готовую строку в ограниченную очередь и сразу отвечает 202.
+    Фоновый поток вставляет строки через executemany одним коммитом на пачку:
+    пачка закрывается по INGEST_BATCH_SIZE строк или через INGEST_FLUSH_INTERVAL_MS
+    после первой строки. При остановке процесса очередь дописывается до конца.
+    Пачка, которую не удалось записать за 3 попытки, уходит в файл
+    INGEST_DEAD_LETTER_PATH: клиенту уже ответили 202, терять ее нельзя.
+    Дописать такие строки в БД - `flask ingest-replay`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.dead_letter_path = app.config['INGEST_DEAD_LETTER_PATH']
+        self.batch_size = app.config['INGEST_BATCH_SIZE']
+        self.interval = app.config['INGEST_FLUSH_INTERVAL_MS'] / 1000
+        self.queue = queue.Queue(maxsize=app.config['INGEST_QUEUE_SIZE'])
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='submission-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, source, row):
+        if self._stopped.is_set():
+            raise IngestQueueFull()
+        try:
+            self.queue.put_nowait((source, row))
+        except queue.Full:
+            raise IngestQueueFull()
+
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=self.interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stopped.is_set() and self.queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self.flush(batch)
+
+    def flush(self, batch):
+        for attempt in range(3):
+            try:
+                with self.app.app_context():
+                    save_batch(batch)
+                return
+            except Exception as e:
+                logger.warning('Ошибка записи пачки', extra={'size': len(batch), 'attempt': attempt + 1, 'error': str(e)})
+                time.sleep(0.1 * (attempt + 1))
+
+        try:
+            write_dead_letter(self.dead_letter_path, batch)
+            logger.error('Пачка не сохранена в БД, строки записаны в файл', extra={'size': len(batch), 'path': self.dead_letter_path})
+        except Exception:
+            # Последнее место, где строки еще есть: пишем их в лог целиком
+            logger.exception('Пачка не сохранена', extra={'size': len(batch), 'rows': [
+                {'source': source, 'row': row} for source, row in batch]})
+
+    def close(self):
+        """Дописывает очередь и останавливает поток"""
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+def save_batch(batch):
+    """Вставляет пачку [(source, row)] одним коммитом и обновляет почасовую статистику"""
+    rows_by_source = {}
+    for source, row in batch:
+        rows_by_source.setdefault(source, []).append(row)
+    try:
+        for source, rows in rows_by_source.items():
+            db.session.execute(insert(SOURCES[source]), rows)
+            bump_rollup(source, [row['created_at'] for row in rows])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+_dead_letter_lock = threading.Lock()
+
+def write_dead_letter(path, batch):
+    """Дописывает строки пачки в NDJSON-файл (по строке на запись) и сбрасывает его на диск"""
+    data = ''.join(
+        json.dumps({'source': source, 'row': row}, ensure_ascii=False, default=lambda value: value.isoformat()) + '\n'
+        for source, row in batch
+    )
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with _dead_letter_lock, open(path, 'a', encoding='utf-8') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _read_dead_letter(path):
+    batch = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            row = entry['row']
+            for column in SOURCES[entry['source']].__table__.columns:
+                if isinstance(column.type, db.DateTime) and row.get(column.name):
+                    row[column.name] = datetime.fromisoformat(row[column.name])
+            batch.append((entry['source'], row))
+    return batch
+
+def replay_dead_letter(path, batch_size):
+    """Дописывает в БД строки из файла отложенной записи.
+
+    Файл сначала переименовывается, чтобы воркеры писали новые отказы в свежий.
+    Пачка, которая не вставилась целиком, вставляется по одной строке; строки,
+    которые не удалось сохранить и так, возвращаются в файл.
+    Возвращает (сохранено, осталось в файле).
+    """
+    work_path = path + '.replay'
+    if os.path.exists(path):
+        if os.path.exists(work_path):
+            # Остаток прерванного запуска: добавляем к нему новые строки
+            with open(path, encoding='utf-8') as source, open(work_path, 'a', encoding='utf-8') as target:
+                target.write(source.read())
+            os.remove(path)
+        else:
+            os.replace(path, work_path)
+    if not os.path.exists(work_path):
+        return 0, 0
+
+    batch = _read_dead_letter(work_path)
+    saved = 0
+    failed = []
+    for start in range(0, len(batch), batch_size):
+        chunk = batch[start:start + batch_size]
+        try:
+            save_batch(chunk)
+            saved += len(chunk)
+            continue
+        except Exception:
+            pass
+        for entry in chunk:
+            try:
+                save_batch([entry])
+                saved += 1
+            except Exception as e:
+                logger.warning('Строка не сохранена', extra={'source': entry[0], 'error': str(e)})
+                failed.append(entry)
+
+    if failed:
+        write_dead_letter(path, failed)
+    os.remove(work_path)
+    return saved, len(failed)
+
+_writer_lock = threading.Lock()
+
+def get_writer():
+    # Поток создается при первой записи, уже в рабочем процессе (после fork)
+    writer = current_app.extensions.get('submission_writer')
+    if writer is None:
+        with _writer_lock:
+            writer = current_app.extensions.get('submission_writer')
+            if writer is None:
+                writer = SubmissionWriter(current_app._get_current_object())
+                current_app.extensions['submission_writer'] = writer
+    return writer
@@ -0,0 +1,204 @@
+import atexit
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import insert, update
+from extensions import db
+from models import Job
+
+logger = logging.getLogger(__name__)
+
+# kind -> (handler(payload), on_failure(payload, error) или None)
+JOB_HANDLERS = {}
+
+def job_handler(kind, on_failure=None):
+    """Регистрирует обработчик задач вида kind.
+
+    Исключение в обработчике - повтор через JOBS_RETRY_DELAY * 2^(попытка-1);
+    когда попытки кончились, задача получает статус failed и вызывается on_failure.
+    """
+    def decorator(fn):
+        JOB_HANDLERS[kind] = (fn, on_failure)
+        return fn
+    return decorator
+
+def enqueue_many(kind, payloads):
+    """Задачи одного вида одним executemany: в очередь они попадут вместе с коммитом вызывающего кода"""
+    now = datetime.utcnow()
+    db.session.execute(insert(Job), [
+        {'kind': kind, 'payload': json.dumps(payload, ensure_ascii=False), 'run_after': now}
+        for payload in payloads
+    ])
+
+def claim_job():
+    """Забирает одну готовую задачу (queued -> running) или возвращает None.
+
+    Условный UPDATE по статусу: если задачу перехватил другой поток или процесс,
+    rowcount будет 0, и берется следующая.
+    """
+    while True:
+        now = datetime.utcnow()
+        job = Job.query.filter(Job.status == 'queued', Job.run_after <= now).order_by(Job.run_after, Job.id).first()
+        if job is None:
+            db.session.rollback()
+            return None
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == 'queued')
+            .values(status='running', locked_at=now, attempts=Job.attempts + 1)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return job
+
+def requeue_stale(lock_timeout):
+    """Возвращает в очередь задачи, чей процесс умер, не закончив их"""
+    deadline = datetime.utcnow() - timedelta(seconds=lock_timeout)
+    count = db.session.execute(
+        update(Job)
+        .where(Job.status == 'running', Job.locked_at < deadline)
+        .values(status='queued', locked_at=None)
+    ).rowcount
+    db.session.commit()
+    if count:
+        logger.warning('Зависшие задачи возвращены в очередь', extra={'count': count})
+    return count
+
+def retry_failed():
+    """Возвращает упавшие задачи в очередь с обнулением попыток"""
+    count = db.session.execute(
+        update(Job)
+        .where(Job.status == 'failed')
+        .values(status='queued', attempts=0, locked_at=None, run_after=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return count
+
+def run_job(job):
+    config = current_app.config
+    payload = json.loads(job.payload)
+    handler, on_failure = JOB_HANDLERS.get(job.kind, (None, None))
+    try:
+        if handler is None:
+            raise LookupError(f'Нет обработчика для задач {job.kind}')
+        handler(payload)
+        db.session.delete(job)
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        error = f'{type(e).__name__}: {e}'
+        if job.attempts >= config['JOBS_MAX_ATTEMPTS']:
+            job.status = 'failed'
+            job.last_error = error
+            db.session.commit()
+            logger.error('Задача не выполнена', extra={'job_id': job.id, 'kind': job.kind, 'attempts': job.attempts, 'error': error})
+            if on_failure is not None:
+                try:
+                    on_failure(payload, error)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception('Ошибка в on_failure', extra={'job_id': job.id, 'kind': job.kind})
+        else:
+            delay = config['JOBS_RETRY_DELAY'] * 2 ** (job.attempts - 1)
+            job.status = 'queued'
+            job.locked_at = None
+            job.last_error = error
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+            db.session.commit()
+            logger.warning('Задача будет повторена', extra={'job_id': job.id, 'kind': job.kind, 'attempts': job.attempts, 'error': error})
+        return False
+
+def run_pending(stopped=None):
+    """Выполняет готовые задачи, пока они есть. Возвращает число обработанных"""
+    processed = 0
+    while stopped is None or not stopped.is_set():
+        job = claim_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
+
+class JobQueue:
+    """Потоки-обработчики очереди задач в текущем процессе.
+
+    Задачи лежат в таблице job основной БД, поэтому переживают перезапуск и
+    делятся между воркерами gunicorn. Поток ждет JOBS_POLL_INTERVAL_MS или
+    notify() после коммита новой задачи. При остановке процесса текущие задачи
+    дорабатываются; прерванные kill -9 возвращаются в очередь через JOBS_LOCK_TIMEOUT.
+    """
+
+    def __init__(self, app, workers):
+        self.app = app
+        self.interval = app.config['JOBS_POLL_INTERVAL_MS'] / 1000
+        self.lock_timeout = app.config['JOBS_LOCK_TIMEOUT']
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._run, name=f'job-worker-{n}', daemon=True)
+            for n in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        atexit.register(self.close)
+
+    def notify(self):
+        self._wakeup.set()
+
+    def _run(self):
+        next_stale_check = 0
+        while not self._stopped.is_set():
+            processed = 0
+            try:
+                with self.app.app_context():
+                    now = datetime.utcnow().timestamp()
+                    if now >= next_stale_check:
+                        requeue_stale(self.lock_timeout)
+                        next_stale_check = now + self.lock_timeout / 2
+                    processed = run_pending(self._stopped)
+            except Exception:
+                logger.exception('Ошибка обработчика очереди задач')
+            if not processed:
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
+
+    def close(self, timeout=None):
+        """Останавливает потоки после текущих задач"""
+        self._stopped.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join(timeout)
+
+_queue_lock = threading.Lock()
+
+def get_queue():
+    # Потоки создаются в рабочем процессе (после fork), JOBS_WORKERS=0 - только `flask jobs-work`
+    app = current_app._get_current_object()
+    job_queue = app.extensions.get('job_queue')
+    if job_queue is None and app.config['JOBS_WORKERS'] > 0:
+        with _queue_lock:
+            job_queue = app.extensions.get('job_queue')
+            if job_queue is None:
+                job_queue = JobQueue(app, app.config['JOBS_WORKERS'])
+                app.extensions['job_queue'] = job_queue
+    return job_queue
+
+def notify_workers():
+    job_queue = get_queue()
+    if job_queue is not None:
+        job_queue.notify()
+
+def init_jobs(app):
+    """Запускает обработчики очереди с первым запросом процесса"""
+    if app.config['JOBS_WORKERS'] <= 0:
+        return
+
+    @app.before_request
+    def start_job_workers():
+        if 'job_queue' not in app.extensions:
+            get_queue()
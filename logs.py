@@ -0,0 +1,154 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from flask import g, has_request_context, request
+
+# Поля, в имени которых есть такое слово (в extra и во вложенных словарях), в лог не попадают.
+# Слово целиком: refresh_token, X-Api-Key, accessToken скрываются, а счетчик tokens - нет
+SECRET_FIELDS = re.compile(
+    r'(?:^|[_\-])(?:pass(?:word|wd|phrase)?|pwd|secret|token|authorization|cookie|api[_\-]?key)(?:$|[_\-])',
+    re.IGNORECASE
+)
+CAMEL_CASE_BOUNDARY = re.compile(r'(?<=[a-z0-9])(?=[A-Z])')
+# JWT и заголовок Bearer внутри произвольного текста
+SECRET_VALUES = re.compile(r'eyJ[\w-]+\.[\w-]+\.[\w-]*|Bearer\s+\S+')
+REDACTED = '***'
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+REQUEST_ID_PATTERN = re.compile(r'[\w.-]{1,64}')
+
+# Атрибуты LogRecord; все остальное пришло через extra= и выводится как поля JSON
+RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'request_id'}
+
+def is_secret_field(key):
+    return SECRET_FIELDS.search(CAMEL_CASE_BOUNDARY.sub('_', str(key))) is not None
+
+def redact(value, key=None):
+    if key is not None and is_secret_field(key):
+        return REDACTED
+    if isinstance(value, dict):
+        return {k: redact(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, str):
+        return SECRET_VALUES.sub(REDACTED, value)
+    return value
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON: время, уровень, логгер, сообщение, request_id и поля из extra"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': redact(record.getMessage())
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS:
+                entry[key] = redact(value, key)
+        if record.exc_text:
+            entry['exc'] = redact(record.exc_text)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = g.get('request_id') if has_request_context() else None
+        return True
+
+class AsyncHandler(logging.handlers.QueueHandler):
+    """Кладет запись в очередь, в поток вывода пишет QueueListener в отдельном потоке.
+
+    Поток не переживает fork (gunicorn preload), поэтому в новом процессе
+    слушатель запускается заново при первой записи.
+    """
+
+    def __init__(self, target):
+        super().__init__(queue.SimpleQueue())
+        self.target = target
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self.queue = queue.SimpleQueue()
+                self._listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=True)
+                self._listener.start()
+                self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Текст сообщения и traceback фиксируются в вызывающем потоке, JSON собирается в слушателе
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        super().enqueue(record)
+
+    def stop(self):
+        """Дописывает очередь (при выходе из процесса)"""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+        self._pid = None
+
+_handler = None
+
+def init_logging(app):
+    """JSON-логи в stdout через очередь; уровень LOG_LEVEL, id запроса в каждой записи"""
+    global _handler
+    root = logging.getLogger()
+    root.setLevel(app.config['LOG_LEVEL'])
+
+    if _handler is None:
+        target = logging.StreamHandler(sys.stdout)
+        target.setFormatter(JsonFormatter())
+        _handler = AsyncHandler(target)
+        _handler.addFilter(RequestIdFilter())
+        # Логи Flask и werkzeug тоже идут через общий обработчик
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_handler)
+        atexit.register(_handler.stop)
+
+    request_logger = logging.getLogger('unost.request')
+
+    @app.before_request
+    def assign_request_id():
+        # Id от прокси сохраняем, чтобы связать записи nginx и приложения
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = incoming if REQUEST_ID_PATTERN.fullmatch(incoming) else uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        if request_logger.isEnabledFor(logging.DEBUG) and 'request_started' in g:
+            request_logger.debug('Запрос обработан', extra={
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - g.request_started) * 1000, 2)
+            })
+        return response
@@ -0,0 +1,148 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from extensions import db
+
+# Границы корзин гистограмм (секунды и число запросов к БД)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(le, число наблюдений <= le)], последняя граница - +Inf"""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+class EndpointStats:
+    def __init__(self):
+        self.statuses = Counter()
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.db_duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+
+class MetricsRegistry:
+    """Статистика запросов по (endpoint, method) в памяти процесса.
+
+    Каждый воркер gunicorn считает свое: /api/metrics показывает воркер,
+    которому достался запрос.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def observe(self, endpoint, method, status, duration, db_duration, queries):
+        with self._lock:
+            stats = self._endpoints.get((endpoint, method))
+            if stats is None:
+                stats = self._endpoints[(endpoint, method)] = EndpointStats()
+            stats.statuses[status] += 1
+            stats.duration.observe(duration)
+            stats.db_duration.observe(db_duration)
+            stats.queries.observe(queries)
+
+    def render(self):
+        """Текстовый формат Prometheus (text/plain; version=0.0.4)"""
+        lines = [
+            '# HELP unost_http_requests_total Обработанные HTTP-запросы',
+            '# TYPE unost_http_requests_total counter'
+        ]
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            for (endpoint, method), stats in endpoints:
+                for status, count in sorted(stats.statuses.items()):
+                    labels = _labels(endpoint=endpoint, method=method, status=status)
+                    lines.append(f'unost_http_requests_total{{{labels}}} {count}')
+
+            for name, attr, help_text in (
+                ('unost_http_request_duration_seconds', 'duration', 'Время обработки запроса'),
+                ('unost_db_duration_seconds', 'db_duration', 'Время запросов к БД за один HTTP-запрос'),
+                ('unost_db_queries', 'queries', 'Число запросов к БД за один HTTP-запрос')
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (endpoint, method), stats in endpoints:
+                    histogram = getattr(stats, attr)
+                    for bound, count in histogram.cumulative():
+                        labels = _labels(endpoint=endpoint, method=method, le=bound)
+                        lines.append(f'{name}_bucket{{{labels}}} {count}')
+                    labels = _labels(endpoint=endpoint, method=method)
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+def get_registry():
+    return current_app.extensions['metrics']
+
+def init_metrics(app):
+    """Счетчики запросов к БД и времени на каждый HTTP-запрос, заголовок Server-Timing"""
+    if not app.config['METRICS_ENABLED']:
+        return
+    app.extensions['metrics'] = registry = MetricsRegistry()
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def query_started(conn, cursor, statement, parameters, context, executemany):
+        # Соединение выполняет один запрос за раз, поэтому хватает одного значения
+        conn.info['query_started'] = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def query_finished(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('query_started')
+        # Фоновые потоки (ingest) работают без запроса и в статистику не попадают
+        if started is not None and has_request_context() and 'metrics_started' in g:
+            g.db_queries += 1
+            g.db_duration += time.perf_counter() - started
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.db_queries = 0
+        g.db_duration = 0.0
+
+    @app.after_request
+    def record_request_metrics(response):
+        # Для потоковых ответов (?stream=1) учитывается время до начала отдачи тела
+        if 'metrics_started' not in g:
+            return response
+        duration = time.perf_counter() - g.metrics_started
+        registry.observe(
+            request.endpoint or 'unmatched',
+            request.method,
+            response.status_code,
+            duration,
+            g.db_duration,
+            g.db_queries
+        )
+        if app.config['SERVER_TIMING_ENABLED']:
+            response.headers['Server-Timing'] = (
+                f'db;dur={g.db_duration * 1000:.2f};desc="{g.db_queries} queries", '
+                f'app;dur={(duration - g.db_duration) * 1000:.2f}, '
+                f'total;dur={duration * 1000:.2f}'
+            )
+        return response
@@ -0,0 +1,67 @@
+"""search index
+
+Revision ID: 0008_search_index
+Revises: 0007_grade_summary
+Create Date: 2026-10-18 15:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_search_index'
+down_revision = '0007_grade_summary'
+branch_labels = None
+depends_on = None
+
+# Индекс FTS5 -> (таблица с данными, индексируемые столбцы)
+INDEXES = {
+    'complaint_fts': ('complaint', ['complaint_text']),
+    'feedback_fts': ('feedback', ['name', 'email', 'message'])
+}
+
+
+def upgrade():
+    # FTS5 есть только в SQLite; на PostgreSQL поиск отвечает 501
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for index, (table, columns) in INDEXES.items():
+        column_list = ', '.join(columns)
+        new_values = ', '.join(f'new.{column}' for column in columns)
+        old_values = ', '.join(f'old.{column}' for column in columns)
+
+        # External content: текст хранится только в основной таблице, индекс - отдельно
+        op.execute(
+            f"CREATE VIRTUAL TABLE {index} USING fts5({column_list}, content='{table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        # Триггеры ловят и ORM, и пакетные INSERT из ingest.py.
+        # Внимание: batch_alter_table для complaint/feedback в SQLite пересоздает таблицу
+        # и теряет эти триггеры - такая миграция должна создать их заново
+        op.execute(
+            f"CREATE TRIGGER {index}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {index}(rowid, {column_list}) VALUES (new.id, {new_values}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {index}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {index}({index}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {index}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {index}({index}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {index}(rowid, {column_list}) VALUES (new.id, {new_values}); END"
+        )
+        # Индексируем уже накопленные записи (то же делает `flask search-rebuild`)
+        op.execute(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for index in INDEXES:
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {index}_{suffix}')
+        op.execute(f'DROP TABLE IF EXISTS {index}')
@@ -1,7 +1,7 @@
 # models.py
 from extensions import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import hash_password, verify_password
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -9,30 +9,35 @@ class User(db.Model):
     password_hash = db.Column(db.String(255))
     role = db.Column(db.String(20), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Увеличивается при смене роли, чтобы отозвать claims в уже выданных токенах
+    claims_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
 class Student(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     full_name = db.Column(db.String(200), nullable=False)
     birth_date = db.Column(db.Date)
     phone = db.Column(db.String(20))
-    group_id = db.Column(db.Integer, db.ForeignKey('group.id'))
+    group_id = db.Column(db.Integer, db.ForeignKey('group.id'), index=True)
     
     user = db.relationship('User', backref='student')
     group = db.relationship('Group', backref='students')
 
 class Group(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(50), nullable=False)
+    name = db.Column(db.String(50), nullable=False, unique=True, index=True)
     course = db.Column(db.Integer)
 
 class Grade(db.Model):
+    # Индекс (student_id, date) обслуживает постраничный список оценок студента
+    __table_args__ = (db.Index('ix_grade_student_id_date', 'student_id', 'date'),)
+    
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
     subject = db.Column(db.String(100), nullable=False)
@@ -40,14 +45,42 @@ class Grade(db.Model):
     date = db.Column(db.Date, default=datetime.utcnow)
     
     student = db.relationship('Student', backref='grades')
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'student_id': self.student_id,
+            'subject': self.subject,
+            'grade': self.grade,
+            'date': self.date.isoformat() if self.date else None
+        }
+
+class GradeSummary(db.Model):
+    """Сводка оценок студента по предмету, обновляется при каждой записи оценок"""
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), primary_key=True)
+    subject = db.Column(db.String(100), primary_key=True)
+    grade_count = db.Column(db.Integer, nullable=False, default=0)
+    grade_sum = db.Column(db.Integer, nullable=False, default=0)
+    # Распределение по оценкам 1-5
+    count_1 = db.Column(db.Integer, nullable=False, default=0)
+    count_2 = db.Column(db.Integer, nullable=False, default=0)
+    count_3 = db.Column(db.Integer, nullable=False, default=0)
+    count_4 = db.Column(db.Integer, nullable=False, default=0)
+    count_5 = db.Column(db.Integer, nullable=False, default=0)
 
 class PortfolioFile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
-    saved_filename = db.Column(db.String(255), nullable=False)
+    # SHA-256 содержимого: одинаковые файлы хранятся один раз
+    saved_filename = db.Column(db.String(255), nullable=False, index=True)
     file_size = db.Column(db.Integer, nullable=False)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
-    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False, index=True)
+    # Обработка после загрузки (jobs.py): pending -> ready или failed
+    status = db.Column(db.String(20), nullable=False, default='pending', server_default='ready')
+    # Тип по сигнатуре содержимого и причина отказа, если обработка не прошла
+    content_type = db.Column(db.String(100))
+    processing_error = db.Column(db.String(255))
     
     student = db.relationship('Student', backref='portfolio_files')
     
@@ -58,7 +91,10 @@ class PortfolioFile(db.Model):
             'saved_filename': self.saved_filename,
             'size': self.file_size,
             'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None,
-            'student_id': self.student_id
+            'student_id': self.student_id,
+            'status': self.status,
+            'content_type': self.content_type,
+            'processing_error': self.processing_error
         }
 
 class Complaint(db.Model):
@@ -66,7 +102,9 @@ class Complaint(db.Model):
     ip_address = db.Column(db.String(45), nullable=False)
     user_agent = db.Column(db.Text, nullable=False)
     complaint_text = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # Идентификатор, который видит отправитель (при отложенной записи id еще нет)
+    public_id = db.Column(db.String(36), unique=True, index=True)
     
     def to_dict(self):
         return {
@@ -74,7 +112,8 @@ class Complaint(db.Model):
             'ip_address': self.ip_address,
             'user_agent': self.user_agent,
             'complaint_text': self.complaint_text,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'public_id': self.public_id
         }
 
 class Feedback(db.Model):
@@ -84,7 +123,8 @@ class Feedback(db.Model):
     message = db.Column(db.Text, nullable=False)
     ip_address = db.Column(db.String(45), nullable=False)
     user_agent = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    public_id = db.Column(db.String(36), unique=True, index=True)
     
     def to_dict(self):
         return {
@@ -94,5 +134,36 @@ class Feedback(db.Model):
             'message': self.message,
             'ip_address': self.ip_address,
             'user_agent': self.user_agent,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'public_id': self.public_id
+        }
+
+class SubmissionRollup(db.Model):
+    """Почасовые счетчики жалоб и обратной связи для статистики"""
+    source = db.Column(db.String(20), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class Job(db.Model):
+    """Фоновая задача (jobs.py). Выполненные задачи удаляются, упавшие остаются для разбора"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    # Аргументы обработчика в JSON
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    # queued -> running -> (удалена) или снова queued до JOBS_MAX_ATTEMPTS, затем failed
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.Index('ix_job_status_run_after', 'status', 'run_after'),)
+
+class RevokedToken(db.Model):
+    """Отозванные JWT (revocation.py); строка удаляется, когда истекает сам токен"""
+    jti = db.Column(db.String(36), primary_key=True)
+    token_type = db.Column(db.String(10), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    # None - токен без срока действия (выданный до перехода на короткие токены)
+    expires_at = db.Column(db.DateTime, index=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
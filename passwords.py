@@ -0,0 +1,135 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import threading
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Параметры по умолчанию, которые werkzeug подставляет для короткой записи метода
+DEFAULT_METHOD_PARAMS = {
+    'scrypt': 'scrypt:32768:8:1',
+    'pbkdf2': 'pbkdf2:sha256:600000',
+    'pbkdf2:sha256': 'pbkdf2:sha256:600000'
+}
+
+# Процессы пула не форкаются от воркера: в нем работают потоки (gthread, очередь задач,
+# логи), и дочерний процесс мог бы унаследовать захваченную ими блокировку
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+class PasswordPoolBusy(Exception):
+    """Все слоты пула хеширования заняты дольше PASSWORD_POOL_TIMEOUT"""
+
+class PasswordPool:
+    """Ограниченный пул процессов для хеширования и проверки паролей.
+
+    Семафор ограничивает число задач в работе и в очереди: при всплеске
+    запросов лишние сразу получают PasswordPoolBusy вместо ожидания.
+    """
+
+    def __init__(self, workers, queue_size, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # После fork (gunicorn preload) пул родителя непригоден, создаем свой
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(START_METHOD)
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, fn, *args):
+        if self.workers == 0:
+            return fn(*args)
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordPoolBusy()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def map(self, fn, *iterables):
+        """Пакетная обработка (массовый импорт) через те же слоты, что и вход.
+
+        В пуле одновременно не больше workers задач пакета, поэтому запрос входа
+        ждет не дольше одной волны хеширования, а не всего импорта. Если слот не
+        освободился за PASSWORD_POOL_TIMEOUT, пакет прерывается PasswordPoolBusy.
+        """
+        if self.workers == 0:
+            return list(map(fn, *iterables))
+
+        executor = self._get_executor()
+        in_flight = threading.BoundedSemaphore(self.workers)
+        futures = []
+
+        def release(_):
+            self._slots.release()
+            in_flight.release()
+
+        try:
+            for args in zip(*iterables):
+                in_flight.acquire()
+                if not self._slots.acquire(timeout=self.timeout):
+                    in_flight.release()
+                    raise PasswordPoolBusy()
+                try:
+                    future = executor.submit(fn, *args)
+                except Exception:
+                    release(None)
+                    raise
+                future.add_done_callback(release)
+                futures.append(future)
+            return [future.result() for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+def get_pool():
+    pool = current_app.extensions.get('password_pool')
+    if pool is None:
+        pool = PasswordPool(
+            current_app.config['PASSWORD_POOL_WORKERS'],
+            current_app.config['PASSWORD_POOL_QUEUE'],
+            current_app.config['PASSWORD_POOL_TIMEOUT']
+        )
+        current_app.extensions['password_pool'] = pool
+    return pool
+
+def normalize_method(method):
+    return DEFAULT_METHOD_PARAMS.get(method, method)
+
+def hash_password(password):
+    method = current_app.config['PASSWORD_HASH_METHOD']
+    return get_pool().run(generate_password_hash, password, method)
+
+def hash_passwords(passwords):
+    """Хеширует список паролей параллельно на процессах пула, не занимая очередь входа целиком"""
+    method = current_app.config['PASSWORD_HASH_METHOD']
+    return get_pool().map(generate_password_hash, passwords, [method] * len(passwords))
+
+def verify_password(pwhash, password):
+    if not pwhash:
+        return False
+    return get_pool().run(check_password_hash, pwhash, password)
+
+def needs_rehash(pwhash):
+    """True, если хеш сделан не тем методом или не с той стоимостью, что в конфиге"""
+    method = pwhash.split('$', 1)[0]
+    return normalize_method(method) != normalize_method(current_app.config['PASSWORD_HASH_METHOD'])
@@ -0,0 +1,70 @@
+import hashlib
+from flask import current_app
+from sqlalchemy import event
+from extensions import db
+from models import User, Student, Group
+from cache import TTLCache
+
+def get_profile_cache():
+    cache = current_app.extensions.get('profile_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('profile_cache', TTLCache(
+            current_app.config['PROFILE_CACHE_SIZE'],
+            current_app.config['PROFILE_CACHE_TTL']
+        ))
+    return cache
+
+def profile_query(student_id):
+    """Профиль студента одним запросом: только нужные столбцы student, user и group"""
+    return db.session.query(
+        Student.id, Student.full_name, Student.phone, Student.birth_date,
+        Student.group_id, Student.user_id, User.email, Group.name.label('group_name')
+    ).join(User, User.id == Student.user_id).outerjoin(
+        Group, Group.id == Student.group_id
+    ).filter(Student.id == student_id)
+
+def load_profile(student_id):
+    row = profile_query(student_id).first()
+    if row is None:
+        return None
+    return {
+        'id': row.id,
+        'full_name': row.full_name,
+        'email': row.email,
+        'phone': row.phone,
+        'birth_date': row.birth_date.isoformat() if row.birth_date else None,
+        'group': row.group_name,
+        'group_id': row.group_id,
+        'user_id': row.user_id
+    }
+
+def cached_profile(user_id, student_id):
+    """(профиль, ETag) из кэша или из БД; (None, None), если студента нет"""
+    cache = get_profile_cache()
+    cached = cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    profile = load_profile(student_id)
+    if profile is None:
+        return None, None
+    etag = hashlib.sha1(current_app.json.dumps(profile, sort_keys=True).encode()).hexdigest()
+    cache.set(user_id, (profile, etag))
+    return profile, etag
+
+# Сброс кэша при изменении данных, из которых собирается профиль.
+# Другие процессы увидят изменение не позже чем через PROFILE_CACHE_TTL.
+@event.listens_for(Student, 'after_update')
+@event.listens_for(Student, 'after_delete')
+def _invalidate_student_profile(mapper, connection, target):
+    get_profile_cache().delete(target.user_id)
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_user_profile(mapper, connection, target):
+    get_profile_cache().delete(target.id)
+
+@event.listens_for(Group, 'after_update')
+@event.listens_for(Group, 'after_delete')
+def _invalidate_group_profiles(mapper, connection, target):
+    get_profile_cache().clear()
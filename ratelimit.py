@@ -0,0 +1,119 @@
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from flask import current_app, jsonify
+
+PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400
+}
+
+# capacity - размер корзины (допустимый всплеск), rate - жетонов в секунду
+Limit = namedtuple('Limit', ['capacity', 'rate'])
+
+def parse_limit(value):
+    """'10/minute' -> Limit(10, 10 / 60); пустое значение - без ограничения"""
+    if not value:
+        return None
+    try:
+        count, period = value.split('/', 1)
+        count = int(count)
+        seconds = PERIODS[period.strip()]
+    except (ValueError, KeyError):
+        raise ValueError(f'Некорректный лимит {value!r}, нужен вид 10/minute')
+    if count < 1:
+        raise ValueError(f'Некорректный лимит {value!r}, число запросов должно быть положительным')
+    return Limit(count, count / seconds)
+
+class RateLimitBackend:
+    """Хранилище корзин. Общее для процессов хранилище реализует тот же метод
+    и регистрируется в BACKENDS."""
+
+    def consume(self, key, limit, now):
+        """Забирает жетон из корзины key -> (разрешено, секунд до следующего жетона)"""
+        raise NotImplementedError
+
+class MemoryBackend(RateLimitBackend):
+    """Корзины в памяти процесса, не больше max_keys штук.
+
+    При переполнении вытесняется корзина, к которой дольше всего не обращались:
+    она почти наверняка уже наполнилась, и новая полная корзина ничем не отличается.
+    Каждый воркер gunicorn считает свои корзины, поэтому фактический лимит в N раз выше.
+    """
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, limit, now):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = limit.capacity
+            else:
+                tokens, updated = bucket
+                tokens = min(limit.capacity, tokens + (now - updated) * limit.rate)
+                self._buckets.move_to_end(key)
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        return allowed, 0 if allowed else (1 - tokens) / limit.rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+BACKENDS = {
+    'memory': lambda config: MemoryBackend(config['RATE_LIMIT_MAX_KEYS'])
+}
+
+class RateLimiter:
+    def __init__(self, backend, limits):
+        self.backend = backend
+        self.limits = limits
+
+    def hit(self, name, key):
+        limit = self.limits.get(name)
+        if limit is None:
+            return True, 0
+        return self.backend.consume(f'{name}:{key}', limit, time.monotonic())
+
+def get_limiter():
+    limiter = current_app.extensions.get('rate_limiter')
+    if limiter is None:
+        config = current_app.config
+        if config['RATE_LIMIT_BACKEND'] not in BACKENDS:
+            raise ValueError(f"Неизвестный RATE_LIMIT_BACKEND: {config['RATE_LIMIT_BACKEND']}")
+        limiter = RateLimiter(
+            BACKENDS[config['RATE_LIMIT_BACKEND']](config),
+            {name: parse_limit(value) for name, value in config['RATE_LIMITS'].items()}
+        )
+        current_app.extensions['rate_limiter'] = limiter
+    return limiter
+
+def rate_limited(name, key_func):
+    """Ограничивает частоту вызовов обработчика по ключу key_func() (обычно IP клиента).
+
+    Сверх лимита RATE_LIMITS[name] отвечает 429 с Retry-After.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if current_app.config['RATE_LIMIT_ENABLED']:
+                allowed, retry_after = get_limiter().hit(name, key_func())
+                if not allowed:
+                    response = jsonify({'error': 'Слишком много запросов, повторите попытку позже'})
+                    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                    return response, 429
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
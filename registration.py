@@ -0,0 +1,27 @@
+from datetime import datetime
+
+REQUIRED_FIELDS = ['email', 'password', 'full_name', 'phone', 'birth_date', 'group']
+
+def validate_registration(data):
+    """Проверка полей регистрации без обращения к БД.
+
+    Возвращает (данные, None) или (None, текст ошибки). Используется
+    и в /api/register, и при массовом импорте студентов.
+    """
+    for field in REQUIRED_FIELDS:
+        if not data.get(field):
+            return None, f'Поле {field} обязательно'
+
+    try:
+        birth_date = datetime.strptime(data.get('birth_date'), '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None, 'Неверный формат даты. Используйте YYYY-MM-DD'
+
+    return {
+        'email': data.get('email'),
+        'password': data.get('password'),
+        'full_name': data.get('full_name'),
+        'phone': data.get('phone'),
+        'birth_date': birth_date,
+        'group': data.get('group')
+    }, None
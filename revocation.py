@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app, jsonify
+from sqlalchemy import delete, or_, select
+from database import dialect_insert
+from extensions import db, jwt
+from models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Строки, закоммиченные с опозданием (долгая транзакция, разброс часов), дочитываются повторно
+SYNC_OVERLAP = timedelta(seconds=60)
+
+class RevocationList:
+    """Отозванные jti в памяти процесса: проверка токена без запроса к БД.
+
+    Источник правды - таблица revoked_token. Отзыв в этом процессе виден сразу,
+    в остальных - после синхронизации не реже раза в JWT_REVOCATION_SYNC_SECONDS:
+    один запрос дочитывает новые строки. Раз в JWT_REVOCATION_PRUNE_SECONDS
+    истекшие токены удаляются из памяти и из таблицы. Словарь держит только
+    отозванные и еще не истекшие токены, поэтому остается небольшим.
+    """
+
+    def __init__(self, sync_interval, prune_interval):
+        self.sync_interval = sync_interval
+        self.prune_interval = prune_interval
+        # jti -> момент истечения (datetime UTC) или None; меняется только под _lock,
+        # чтение без блокировки: при чистке словарь заменяется целиком одним присваиванием
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._synced_at = None
+        self._next_sync = 0
+        self._next_prune = 0
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def is_revoked(self, jti):
+        if time.monotonic() >= self._next_sync:
+            self.sync()
+        return jti in self._revoked
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def sync(self):
+        # Синхронизирует один поток, остальные пока проверяют по текущему словарю
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.monotonic()
+            if now < self._next_sync:
+                return
+            started = datetime.utcnow()
+            query = select(RevokedToken.jti, RevokedToken.expires_at)
+            if self._synced_at is None:
+                query = query.where(or_(RevokedToken.expires_at.is_(None), RevokedToken.expires_at > started))
+            else:
+                query = query.where(RevokedToken.revoked_at >= self._synced_at - SYNC_OVERLAP)
+
+            prune = now >= self._next_prune
+            with db.engine.begin() as connection:
+                rows = connection.execute(query).all()
+                if prune:
+                    connection.execute(delete(RevokedToken).where(RevokedToken.expires_at < started))
+
+            # Запрос к БД идет без _lock, чтобы не задерживать add() в обработчиках выхода
+            with self._lock:
+                self._revoked.update(rows)
+                if prune:
+                    self._revoked = {
+                        jti: expires_at for jti, expires_at in self._revoked.items()
+                        if expires_at is None or expires_at > started
+                    }
+                    self._next_prune = now + self.prune_interval
+
+            self._synced_at = started
+            self._next_sync = now + self.sync_interval
+        except Exception:
+            # БД недоступна: проверяем по тому, что уже загружено, повтор при следующем запросе
+            logger.exception('Ошибка синхронизации отозванных токенов')
+        finally:
+            self._sync_lock.release()
+
+def get_revocation_list():
+    return current_app.extensions['token_revocations']
+
+def revoke_tokens(payloads):
+    """Отзывает токены по их расшифрованному содержимому; коммит остается за вызывающим кодом"""
+    rows = [{
+        'jti': payload['jti'],
+        'token_type': payload.get('type', 'access'),
+        'user_id': int(payload['sub']),
+        'expires_at': datetime.utcfromtimestamp(payload['exp']) if 'exp' in payload else None,
+        'revoked_at': datetime.utcnow()
+    } for payload in payloads]
+    db.session.execute(dialect_insert(RevokedToken).values(rows).on_conflict_do_nothing(index_elements=['jti']))
+    revocations = get_revocation_list()
+    for row in rows:
+        revocations.add(row['jti'], row['expires_at'])
+
+@jwt.token_in_blocklist_loader
+def check_if_token_revoked(jwt_header, jwt_payload):
+    # Токены без срока действия, выданные до появления refresh-токенов, больше не принимаются
+    if 'exp' not in jwt_payload and current_app.config['JWT_REJECT_NON_EXPIRING']:
+        return True
+    return get_revocation_list().is_revoked(jwt_payload.get('jti'))
+
+@jwt.revoked_token_loader
+def revoked_token_response(jwt_header, jwt_payload):
+    return jsonify({'error': 'Токен отозван, войдите заново'}), 401
+
+@jwt.expired_token_loader
+def expired_token_response(jwt_header, jwt_payload):
+    # Клиент обновляет access-токен через POST /api/refresh
+    return jsonify({'error': 'Срок действия токена истек'}), 401
+
+def init_revocation(app):
+    app.extensions['token_revocations'] = RevocationList(
+        app.config['JWT_REVOCATION_SYNC_SECONDS'],
+        app.config['JWT_REVOCATION_PRUNE_SECONDS']
+    )
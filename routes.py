@@ -1,53 +1,176 @@
-from flask import Blueprint, request, jsonify, send_file
-from flask_jwt_extended import jwt_required, create_access_token, get_jwt_identity
+from flask import Blueprint, request, jsonify, send_file, redirect, Response, stream_with_context, current_app
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity, decode_token
+from jwt import ExpiredSignatureError
+from sqlalchemy import and_, or_
 from extensions import db
+from auth import create_user_token, token_response, access_token_lifetime, roles_required, admin_required, teacher_required, student_required
+from stats import bump_rollup, parse_window, rollup_stats, SERIES_STEPS
 from models import User, Student, Grade, Group, PortfolioFile, Complaint, Feedback
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from passwords import PasswordPoolBusy, needs_rehash
+from ingest import IngestQueueFull, get_writer
+from jobs import enqueue_many, notify_workers
+from groups import get_group_registry
+from profiles import cached_profile
+from registration import validate_registration
+from importer import parse_rows, import_students
+from grades import parse_grade_date, validate_grades, record_grades, grade_summary
+from search import SearchUnavailable, search
+from ratelimit import rate_limited
+from metrics import get_registry
+from exporter import EXPORT_FORMATS, export_stream, export_filename
+from storage import LocalStorage, get_storage
+from revocation import revoke_tokens
+from archive import portfolio_archive
+from uploads import (
+    MAX_FILES_PER_UPLOAD, FileTooLarge, check_upload, is_content_addressed,
+    receive_uploads, publish_blobs, discard_upload, lock_blobs, release_blobs
+)
+from werkzeug.exceptions import RequestEntityTooLarge
+from datetime import date, datetime
+import logging
 import os
 import uuid
+import csv
+import base64
+import mimetypes
 from werkzeug.utils import secure_filename
 
-# Настройки для загрузки файлов
-UPLOAD_FOLDER = 'uploads/portfolio'
-ALLOWED_EXTENSIONS = {'pdf', 'jpg', 'jpeg', 'png', 'doc', 'docx'}
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
+logger = logging.getLogger(__name__)
 
-def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+# Настройки постраничной выдачи для админских списков
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+STREAM_BATCH_SIZE = 500
+
+# Курсор - это пара (значение столбца сортировки, id) последней выданной записи
+def encode_cursor(value, item_id):
+    raw = f"{value.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, parse=datetime.fromisoformat):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    value, item_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|', 1)
+    return parse(value), int(item_id)
+
+def parse_page_args(parse=datetime.fromisoformat):
+    """Разбирает ?cursor= и ?limit=, при ошибке бросает ValueError"""
+    limit = request.args.get('limit', DEFAULT_PAGE_LIMIT, type=int)
+    if limit is None or limit < 1:
+        raise ValueError('limit должен быть положительным числом')
+    limit = min(limit, MAX_PAGE_LIMIT)
+
+    cursor = request.args.get('cursor')
+    try:
+        cursor = decode_cursor(cursor, parse) if cursor else None
+    except Exception:
+        raise ValueError('Некорректный cursor')
+    return cursor, limit
+
+def keyset_query(model, cursor, limit, column=None, query=None):
+    """Записи, отсортированные по (column, id) по убыванию, начиная после cursor.
+
+    По умолчанию column - created_at, query - все записи модели.
+    """
+    column = column if column is not None else model.created_at
+    query = (query if query is not None else model.query).order_by(column.desc(), model.id.desc())
+    if cursor:
+        value, item_id = cursor
+        # Отдельное условие <= даёт SQLite диапазон по индексу столбца сортировки
+        query = query.filter(
+            column <= value,
+            or_(column < value, and_(column == value, model.id < item_id))
+        )
+    return query.limit(limit)
+
+def keyset_page(model, cursor, limit):
+    return keyset_query(model, cursor, limit).all()
+
+def keyset_listing(model):
+    """Ответ для админского списка: страница с next_cursor или потоковый JSON-массив (?stream=1)"""
+    try:
+        cursor, limit = parse_page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if request.args.get('stream') in ('1', 'true'):
+        def generate(cursor):
+            # Выбираем записи пачками, в памяти держим только одну пачку
+            yield '['
+            first = True
+            while True:
+                batch = keyset_page(model, cursor, STREAM_BATCH_SIZE)
+                for item in batch:
+                    yield ('' if first else ',') + current_app.json.dumps(item.to_dict())
+                    first = False
+                if len(batch) < STREAM_BATCH_SIZE:
+                    break
+                cursor = (batch[-1].created_at, batch[-1].id)
+            yield ']'
+
+        return Response(stream_with_context(generate(cursor)), mimetype='application/json')
+
+    items = keyset_page(model, cursor, limit + 1)
+    has_more = len(items) > limit
+    items = items[:limit]
+    return jsonify({
+        'items': [item.to_dict() for item in items],
+        'next_cursor': encode_cursor(items[-1].created_at, items[-1].id) if has_more else None,
+        'limit': limit
+    })
+
+# Тип тела запроса -> формат файла импорта студентов
+IMPORT_MIMETYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson'
+}
 
 auth_routes = Blueprint('auth', __name__)
 student_routes = Blueprint('students', __name__)
 complaint_routes = Blueprint('complaints', __name__)
 feedback_routes = Blueprint('feedback', __name__)
+grade_routes = Blueprint('grades', __name__)
+
+def password_pool_busy():
+    response = jsonify({'error': 'Сервер перегружен, повторите попытку позже'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 # Аутентификация
 @auth_routes.route('/api/login', methods=['POST'])
 def login():
     try:
         data = request.get_json()
-        print("Login attempt:", data.get('email'))
+        logger.debug('Попытка входа', extra={'email': data.get('email') if data else None})
         
         if not data or not data.get('email') or not data.get('password'):
             return jsonify({'error': 'Email и пароль обязательны'}), 400
             
         user = User.query.filter_by(email=data.get('email')).first()
         
-        if user and check_password_hash(user.password_hash, data.get('password')):
-            access_token = create_access_token(identity=str(user.id))
-            print(f"Login successful for user {user.id}, token created")
+        if user and user.check_password(data.get('password')):
+            # Хеш со старыми параметрами обновляем, пока пароль известен
+            if needs_rehash(user.password_hash):
+                user.set_password(data.get('password'))
+                db.session.commit()
+                logger.info('Хеш пароля обновлен', extra={'user_id': user.id})
+            
+            student = Student.query.filter_by(user_id=user.id).first()
+            tokens = token_response(user, student.id if student else None)
+            logger.debug('Успешный вход', extra={'user_id': user.id})
             return jsonify({
-                'token': access_token,
+                **tokens,
                 'user_id': user.id,
                 'role': user.role
             })
         
-        print("Login failed: invalid credentials")
+        logger.info('Неудачный вход', extra={'email': data.get('email')})
         return jsonify({'error': 'Неверные учетные данные'}), 401
         
+    except PasswordPoolBusy:
+        return password_pool_busy()
     except Exception as e:
-        print(f"Login error: {str(e)}")
+        logger.exception('Ошибка входа')
         return jsonify({'error': f'Ошибка сервера: {str(e)}'}), 500
 
 # Регистрация
@@ -55,68 +178,116 @@ def login():
 def register():
     try:
         data = request.get_json()
-        print("Registration attempt:", data.get('email'))
+        logger.debug('Попытка регистрации', extra={'email': data.get('email') if data else None})
         
-        required_fields = ['email', 'password', 'full_name', 'phone', 'birth_date', 'group']
-        for field in required_fields:
-            if not data.get(field):
-                return jsonify({'error': f'Поле {field} обязательно'}), 400
+        data, error = validate_registration(data)
+        if error:
+            return jsonify({'error': error}), 400
         
-        if User.query.filter_by(email=data.get('email')).first():
+        if User.query.filter_by(email=data['email']).first():
             return jsonify({'error': 'Пользователь с таким email уже существует'}), 400
         
         user = User(
-            email=data.get('email'),
+            email=data['email'],
             role='student'
         )
-        user.set_password(data.get('password'))
+        user.set_password(data['password'])
         
         db.session.add(user)
         db.session.flush()
-        print(f"User created with ID: {user.id}")
+        logger.debug('Пользователь создан', extra={'user_id': user.id})
     
-        group_name = data.get('group')
-        group = Group.query.filter_by(name=group_name).first()
-        if not group:
+        group_name = data['group']
+        group_id = get_group_registry().id_for(group_name)
+        if group_id is None:
             group = Group(name=group_name)
             db.session.add(group)
             db.session.flush()
-            print(f"Group created: {group_name}")
+            group_id = group.id
+            logger.info('Группа создана', extra={'group': group_name})
         
         student = Student(
             user_id=user.id,
-            full_name=data.get('full_name'),
-            phone=data.get('phone'),
-            group_id=group.id
+            full_name=data['full_name'],
+            phone=data['phone'],
+            birth_date=data['birth_date'],
+            group_id=group_id
         )
         
-        if data.get('birth_date'):
-            try:
-                student.birth_date = datetime.strptime(data.get('birth_date'), '%Y-%m-%d').date()
-            except ValueError:
-                return jsonify({'error': 'Неверный формат даты. Используйте YYYY-MM-DD'}), 400
-        
         db.session.add(student)
         db.session.commit()
         
-        access_token = create_access_token(identity=str(user.id))
-        print(f"Registration successful, token created for user {user.id}")
+        tokens = token_response(user, student.id)
+        logger.info('Регистрация завершена', extra={'user_id': user.id})
         
         return jsonify({
-            'token': access_token,
+            **tokens,
             'user': {
                 'id': user.id,
                 'email': user.email,
                 'role': user.role,
                 'full_name': student.full_name,
-                'group': group.name
+                'group': group_name
             }
         }), 201
         
+    except PasswordPoolBusy:
+        db.session.rollback()
+        return password_pool_busy()
     except Exception as e:
         db.session.rollback()
-        print(f"Registration error: {str(e)}")
+        logger.exception('Ошибка регистрации')
         return jsonify({'error': f'Ошибка регистрации: {str(e)}'}), 500
+
+# Новый access-токен по refresh-токену: роль и student_id берутся из БД
+@auth_routes.route('/api/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    try:
+        user = db.session.get(User, int(get_jwt_identity()))
+        # Смена роли или `flask revoke-tokens` отзывают и refresh-токены
+        if user is None or get_jwt().get('cv', 0) != (user.claims_version or 0):
+            return jsonify({'error': 'Данные токена устарели, войдите заново'}), 401
+        
+        student_id = db.session.query(Student.id).filter_by(user_id=user.id).scalar()
+        return jsonify({
+            'token': create_user_token(user, student_id),
+            'expires_in': access_token_lifetime()
+        })
+    except Exception as e:
+        logger.exception('Ошибка обновления токена')
+        return jsonify({'error': f'Ошибка сервера: {str(e)}'}), 500
+
+# Выход: отзывает токен запроса и, если передан, refresh-токен той же сессии
+@auth_routes.route('/api/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    try:
+        payloads = [get_jwt()]
+        data = request.get_json(silent=True) or {}
+        if data.get('refresh_token'):
+            try:
+                refresh_payload = decode_token(data['refresh_token'])
+            except ExpiredSignatureError:
+                # Истекший токен отзывать не нужно
+                refresh_payload = None
+            except Exception:
+                return jsonify({'error': 'Некорректный refresh_token'}), 400
+            if refresh_payload is not None:
+                if refresh_payload.get('type') != 'refresh':
+                    return jsonify({'error': 'Некорректный refresh_token'}), 400
+                if refresh_payload['sub'] != get_jwt_identity():
+                    return jsonify({'error': 'refresh_token принадлежит другому пользователю'}), 400
+                payloads.append(refresh_payload)
+        
+        revoke_tokens(payloads)
+        db.session.commit()
+        logger.info('Выход', extra={'user_id': get_jwt_identity(), 'tokens': len(payloads)})
+        return jsonify({'message': 'Токены отозваны'})
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Ошибка выхода')
+        return jsonify({'error': f'Ошибка сервера: {str(e)}'}), 500
     
 # В routes.py, в раздел аутентификации добавьте:
 @auth_routes.route('/api/', methods=['GET'])
@@ -127,42 +298,68 @@ def api_root():
         'endpoints': {
             'login': '/api/login',
             'register': '/api/register',
+            'refresh': '/api/refresh',
+            'logout': '/api/logout',
             'students': '/api/students',
             'complaints': '/api/complaints',
             'feedback': '/api/feedback',
+            'groups': '/api/groups',
+            'grades': '/api/grades',
             'check-token': '/api/check-token'
         }
     })
 
+# Справочник групп для выбора при регистрации
+@auth_routes.route('/api/groups', methods=['GET'])
+def get_groups():
+    try:
+        registry = get_group_registry()
+        groups = registry.all()
+        
+        # Список меняется редко: клиент кэширует его и перепроверяет по ETag
+        response = jsonify(groups)
+        response.set_etag(registry.etag)
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 
+
+# Метрики процесса в формате Prometheus (только для админов)
+@auth_routes.route('/api/metrics', methods=['GET'])
+@admin_required
+def get_metrics(identity):
+    try:
+        if 'metrics' not in current_app.extensions:
+            return jsonify({'error': 'Метрики отключены (METRICS_ENABLED)'}), 404
+        return Response(get_registry().render(), mimetype='text/plain; version=0.0.4')
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Получить профиль студента
 @student_routes.route('/api/students/profile', methods=['GET'])
-@jwt_required()
-def get_profile():
+@student_required
+def get_profile(identity):
     try:
-        user_id = get_jwt_identity()
-        print(f"Profile request for user_id: {user_id}")
+        logger.debug('Запрос профиля', extra={'user_id': identity.user_id})
         
-        student = Student.query.filter_by(user_id=int(user_id)).first()
+        # Профиль собирается одним запросом и кэшируется по user_id, клиент перепроверяет его по ETag
+        profile, etag = cached_profile(identity.user_id, identity.student_id)
         
-        if not student:
-            print(f"Student not found for user_id: {user_id}")
+        if not profile:
+            logger.info('Профиль студента не найден', extra={'user_id': identity.user_id})
             return jsonify({'error': 'Профиль студента не найден'}), 404
         
-        print(f"Profile found for: {student.full_name}")
-        return jsonify({
-            'id': student.id,
-            'full_name': student.full_name,
-            'email': student.user.email,
-            'phone': student.phone,
-            'birth_date': student.birth_date.isoformat() if student.birth_date else None,
-            'group': student.group.name if student.group else None,
-            'group_id': student.group_id,
-            'user_id': student.user_id
-        })
+        response = jsonify(profile)
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
     except Exception as e:
-        print(f"Profile error: {str(e)}")
+        logger.exception('Ошибка загрузки профиля')
         return jsonify({'error': f'Ошибка загрузки профиля: {str(e)}'}), 500
 
 # Тестовый маршрут для проверки JWT
@@ -193,21 +390,21 @@ def debug_token():
     try:
         data = request.get_json()
         token = data.get('token')
-        print(f"🔐 Отладка токена: {token}")
+        # Сам токен в лог не пишется (см. logs.redact)
+        logger.debug('Отладка токена', extra={'token': token})
         
         if not token:
             return jsonify({'error': 'Токен не предоставлен'}), 400
         
-        from flask_jwt_extended import decode_token
         try:
             decoded = decode_token(token)
-            print(f"✅ Токен декодирован: {decoded}")
+            logger.debug('Токен декодирован', extra={'claims': decoded})
             return jsonify({
                 'status': 'valid',
                 'decoded': decoded
             }), 200
         except Exception as e:
-            print(f"❌ Ошибка декодирования: {str(e)}")
+            logger.info('Ошибка декодирования токена', extra={'error': str(e)})
             return jsonify({
                 'status': 'invalid',
                 'error': str(e)
@@ -218,128 +415,337 @@ def debug_token():
 
 # Маршруты для портфолио
 @student_routes.route('/api/students/portfolio', methods=['GET'])
-@jwt_required()
-def get_portfolio_files():
+@student_required
+def get_portfolio_files(identity):
     try:
-        current_user_id = get_jwt_identity()
-        student = Student.query.filter_by(user_id=int(current_user_id)).first()
-        
-        if not student:
-            return jsonify({'error': 'Студент не найден'}), 404
-        
-        portfolio_files = PortfolioFile.query.filter_by(student_id=student.id).all()
+        portfolio_files = PortfolioFile.query.filter_by(student_id=identity.student_id).all()
         return jsonify([file.to_dict() for file in portfolio_files])
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def upload_error_response(files, errors, status):
+    """Ошибка загрузки: для одного файла - как раньше, для нескольких - с причиной по каждому"""
+    if len(files) == 1:
+        return jsonify({'error': errors[0]}), status
+    return jsonify({
+        'error': 'Файлы не сохранены',
+        'files': [{'filename': file.filename, 'error': error} for file, error in zip(files, errors)]
+    }), status
+
+# Один или несколько файлов в поле file (до MAX_FILES_PER_UPLOAD): сохраняются все или ни одного
 @student_routes.route('/api/students/portfolio', methods=['POST'])
-@jwt_required()
-def upload_portfolio_file():
+@student_required
+def upload_portfolio_file(identity):
+    uploads = []
     try:
-        current_user_id = get_jwt_identity()
-        student = Student.query.filter_by(user_id=int(current_user_id)).first()
-        
-        if not student:
-            return jsonify({'error': 'Студент не найден'}), 404
-        
-        if 'file' not in request.files:
+        files = request.files.getlist('file')
+        if not files:
             return jsonify({'error': 'Файл не найден'}), 400
+        if len(files) > MAX_FILES_PER_UPLOAD:
+            return jsonify({'error': f'Не больше {MAX_FILES_PER_UPLOAD} файлов за раз'}), 400
         
-        file = request.files['file']
+        errors = [check_upload(file) for file in files]
+        if any(errors):
+            return upload_error_response(files, errors, 400)
         
-        if file.filename == '':
-            return jsonify({'error': 'Файл не выбран'}), 400
+        # Файл хранится один раз под именем SHA-256 содержимого,
+        # строки PortfolioFile с одинаковым saved_filename - ссылки на него
+        workers = current_app.config['PORTFOLIO_UPLOAD_WORKERS']
+        results = receive_uploads([file.stream for file in files], workers)
+        uploads = [result for result in results if not isinstance(result, Exception)]
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            for _, _, tmp_path in uploads:
+                discard_upload(tmp_path)
+            uploads = []
+            if not all(isinstance(failure, FileTooLarge) for failure in failures):
+                raise next(failure for failure in failures if not isinstance(failure, FileTooLarge))
+            errors = ['Файл слишком большой, максимум 10 МБ' if isinstance(result, FileTooLarge) else None for result in results]
+            return upload_error_response(files, errors, 413)
         
-        if file and allowed_file(file.filename):
-            os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-            
-            file_id = str(uuid.uuid4())
-            original_filename = secure_filename(file.filename)
-            file_extension = original_filename.rsplit('.', 1)[1].lower()
-            saved_filename = f"{file_id}.{file_extension}"
-            
-            file_path = os.path.join(UPLOAD_FOLDER, saved_filename)
-            file.save(file_path)
-            
-            portfolio_file = PortfolioFile(
-                filename=original_filename,
-                saved_filename=saved_filename,
-                file_size=os.path.getsize(file_path),
-                student_id=student.id
+        portfolio_files = [
+            PortfolioFile(
+                filename=secure_filename(file.filename),
+                saved_filename=sha256,
+                file_size=file_size,
+                student_id=identity.student_id,
+                status='pending'
             )
-            
-            db.session.add(portfolio_file)
+            for file, (sha256, file_size, _) in zip(files, uploads)
+        ]
+        # Пока строки не закоммичены, параллельное удаление не тронет эти блобы
+        lock_blobs([sha256 for sha256, _, _ in uploads])
+        db.session.add_all(portfolio_files)
+        db.session.flush()
+        # Проверка файлов идет в фоне, задачи коммитятся вместе со строками
+        enqueue_many('portfolio.process', [{'file_id': portfolio_file.id} for portfolio_file in portfolio_files])
+        # Ответ собираем до коммита, иначе каждая строка перечитывалась бы отдельным SELECT
+        created = [portfolio_file.to_dict() for portfolio_file in portfolio_files]
+        db.session.commit()
+        
+        published = publish_blobs([(sha256, tmp_path) for sha256, _, tmp_path in uploads], workers)
+        failure = next((result for result in published if isinstance(result, Exception)), None)
+        if failure is not None:
+            # Без блобов строки бесполезны: удаляем их и уже опубликованные файлы
+            for portfolio_file in portfolio_files:
+                db.session.delete(portfolio_file)
             db.session.commit()
-            
-            return jsonify(portfolio_file.to_dict()), 201
+            for _, _, tmp_path in uploads:
+                discard_upload(tmp_path)
+            release_blobs([sha256 for sha256, _, _ in uploads])
+            uploads = []
+            raise failure
+        uploads = []
+        notify_workers()
         
-        return jsonify({'error': 'Недопустимый тип файла'}), 400
+        if len(created) == 1:
+            return jsonify(created[0]), 201
+        return jsonify({'files': created}), 201
     
+    except RequestEntityTooLarge:
+        db.session.rollback()
+        return jsonify({'error': 'Файл слишком большой, максимум 10 МБ (50 МБ на все файлы запроса)'}), 413
     except Exception as e:
+        db.session.rollback()
+        for _, _, tmp_path in uploads:
+            discard_upload(tmp_path)
         return jsonify({'error': str(e)}), 500
 
-@student_routes.route('/api/students/portfolio/<int:file_id>/download', methods=['GET'])
-@jwt_required()
-def download_portfolio_file(file_id):
+# Массовый импорт студентов из CSV или NDJSON (только для админов)
+@student_routes.route('/api/admin/students/import', methods=['POST'])
+@admin_required
+def import_students_route(identity):
     try:
-        current_user_id = get_jwt_identity()
-        student = Student.query.filter_by(user_id=int(current_user_id)).first()
+        dry_run = request.args.get('dry_run') in ('1', 'true')
+        file = request.files.get('file')
+        if file:
+            text = file.read().decode('utf-8-sig')
+            fmt = request.args.get('format') or file.filename.rsplit('.', 1)[-1].lower()
+        else:
+            text = request.get_data(as_text=True)
+            fmt = request.args.get('format') or IMPORT_MIMETYPES.get(request.mimetype)
+        
+        try:
+            rows = parse_rows(text, fmt)
+        except (ValueError, csv.Error) as e:
+            return jsonify({'error': str(e)}), 400
         
-        if not student:
+        return jsonify(import_students(rows, dry_run=dry_run))
+    
+    except PasswordPoolBusy:
+        return password_pool_busy()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка импорта: {str(e)}'}), 500
+
+def portfolio_download_response(portfolio_file):
+    """Отдача файла портфолио в режиме PORTFOLIO_DOWNLOAD_MODE.
+
+    direct - файл отдает Flask (ETag, 304 и Range через send_file),
+    x-accel / x-sendfile - Flask только проверяет права, а файл отдает прокси.
+    Из S3 файл в любом режиме отдается редиректом на временную ссылку.
+    """
+    mode = current_app.config['PORTFOLIO_DOWNLOAD_MODE']
+    # У файлов, сохраненных по хешу, имя блоба и есть сильный ETag
+    etag = portfolio_file.saved_filename if is_content_addressed(portfolio_file.saved_filename) else None
+
+    if mode == 'direct' and etag and etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.cache_control.private = True
+        return response
+
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        response = redirect(storage.url(portfolio_file.saved_filename, portfolio_file.filename))
+        response.cache_control.private = True
+        response.cache_control.no_store = True
+        return response
+
+    file_path = storage.local_path(portfolio_file.saved_filename)
+    if file_path is None:
+        return jsonify({'error': 'Файл не найден на сервере'}), 404
+
+    if mode == 'x-accel':
+        response = Response(mimetype=mimetypes.guess_type(portfolio_file.filename)[0] or 'application/octet-stream')
+        # Путь внутри корня хранилища: ab/cd/<хеш> или старый плоский, пока идет storage-migrate
+        response.headers['X-Accel-Redirect'] = current_app.config['PORTFOLIO_ACCEL_PREFIX'] + os.path.relpath(file_path, storage.root)
+        response.headers.set('Content-Disposition', 'attachment', filename=portfolio_file.filename)
+        return response
+
+    response = send_file(
+        file_path,
+        as_attachment=True,
+        download_name=portfolio_file.filename,
+        etag=etag or True,
+        conditional=True
+    )
+    # В режиме x-sendfile send_file сам ставит заголовок X-Sendfile (USE_X_SENDFILE) без тела
+    response.cache_control.private = True
+    return response
+
+def portfolio_archive_response(student_id):
+    """Все файлы портфолио студента одним ZIP, собираемым на лету"""
+    portfolio_files = db.session.query(
+        PortfolioFile.id, PortfolioFile.filename, PortfolioFile.saved_filename, PortfolioFile.uploaded_at
+    ).filter_by(student_id=student_id).order_by(PortfolioFile.id).all()
+    # Соединение с БД не держим, пока архив передается клиенту
+    db.session.rollback()
+    response = Response(stream_with_context(portfolio_archive(portfolio_files)), mimetype='application/zip')
+    response.headers.set('Content-Disposition', 'attachment', filename=f'portfolio-{student_id}.zip')
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.cache_control.private = True
+    return response
+
+@student_routes.route('/api/students/portfolio/archive', methods=['GET'])
+@student_required
+def download_portfolio_archive(identity):
+    try:
+        return portfolio_archive_response(identity.student_id)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Архив портфолио любого студента для кураторов (преподаватели и админы)
+@student_routes.route('/api/students/<int:student_id>/portfolio/archive', methods=['GET'])
+@teacher_required
+def download_student_portfolio_archive(student_id, identity):
+    try:
+        if db.session.get(Student, student_id) is None:
             return jsonify({'error': 'Студент не найден'}), 404
         
-        portfolio_file = PortfolioFile.query.filter_by(id=file_id, student_id=student.id).first()
+        return portfolio_archive_response(student_id)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@student_routes.route('/api/students/portfolio/<int:file_id>/download', methods=['GET'])
+@student_required
+def download_portfolio_file(file_id, identity):
+    try:
+        portfolio_file = PortfolioFile.query.filter_by(id=file_id, student_id=identity.student_id).first()
         
         if not portfolio_file:
             return jsonify({'error': 'Файл не найден'}), 404
         
-        file_path = os.path.join(UPLOAD_FOLDER, portfolio_file.saved_filename)
-        
-        if not os.path.exists(file_path):
-            return jsonify({'error': 'Файл не найден на сервере'}), 404
-        
-        return send_file(file_path, as_attachment=True, download_name=portfolio_file.filename)
+        return portfolio_download_response(portfolio_file)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @student_routes.route('/api/students/portfolio/<int:file_id>', methods=['DELETE'])
-@jwt_required()
-def delete_portfolio_file(file_id):
+@student_required
+def delete_portfolio_file(file_id, identity):
     try:
-        current_user_id = get_jwt_identity()
-        student = Student.query.filter_by(user_id=int(current_user_id)).first()
-        
-        if not student:
-            return jsonify({'error': 'Студент не найден'}), 404
-        
-        portfolio_file = PortfolioFile.query.filter_by(id=file_id, student_id=student.id).first()
+        portfolio_file = PortfolioFile.query.filter_by(id=file_id, student_id=identity.student_id).first()
         
         if not portfolio_file:
             return jsonify({'error': 'Файл не найден'}), 404
         
-        file_path = os.path.join(UPLOAD_FOLDER, portfolio_file.saved_filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        
         db.session.delete(portfolio_file)
         db.session.commit()
+        # Сам файл удаляется только вместе с последней ссылкой на него
+        release_blobs([portfolio_file.saved_filename])
         
         return jsonify({'message': 'Файл удален'}), 200
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def parse_stats_args():
+    """Разбирает ?window=7d и ?series=hour|day для эндпоинтов статистики"""
+    window_name = request.args.get('window', '7d')
+    window = parse_window(window_name)
+    series = request.args.get('series')
+    if series and series not in SERIES_STEPS:
+        raise ValueError('series должен быть hour или day')
+    return window_name, window, series
+
+def stats_response(source, prefix):
+    try:
+        window_name, window, series = parse_stats_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    stats = rollup_stats(source, window, series)
+    response = {
+        f'total_{prefix}': stats['total'],
+        f'recent_{prefix}': stats['recent'],
+        'window': window_name
+    }
+    if series:
+        response['series'] = stats['series']
+    return jsonify(response)
+
+def search_response(source):
+    """Ответ поиска: ?q= (слова), ?limit=, ?offset=; результаты по релевантности"""
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', DEFAULT_PAGE_LIMIT, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if limit is None or limit < 1 or offset is None or offset < 0:
+        return jsonify({'error': 'limit и offset должны быть неотрицательными числами'}), 400
+    limit = min(limit, MAX_PAGE_LIMIT)
+
+    try:
+        results, has_more = search(source, query, limit, offset)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except SearchUnavailable:
+        return jsonify({'error': 'Полнотекстовый поиск доступен только на SQLite'}), 501
+
+    return jsonify({
+        'items': [{**item.to_dict(), 'highlight': highlight} for item, highlight in results],
+        'next_offset': offset + limit if has_more else None,
+        'limit': limit,
+        'q': query
+    })
+
+def parse_period_args():
+    """Разбирает ?from= и ?to= (ГГГГ-ММ-ДД), при ошибке бросает ValueError"""
+    date_from = request.args.get('from')
+    date_to = request.args.get('to')
+    date_from = parse_grade_date(date_from) if date_from else None
+    date_to = parse_grade_date(date_to) if date_to else None
+    if date_from and date_to and date_from > date_to:
+        raise ValueError('from не может быть позже to')
+    return date_from, date_to
+
+def export_response(source):
+    """Потоковая выгрузка: ?format=csv|ndjson, ?from=&to= (ГГГГ-ММ-ДД), ?gzip=1"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'format должен быть csv или ndjson'}), 400
+    try:
+        date_from, date_to = parse_period_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    compress = request.args.get('gzip') in ('1', 'true')
+
+    response = Response(
+        stream_with_context(export_stream(source, fmt, date_from, date_to, compress)),
+        mimetype='application/gzip' if compress else EXPORT_FORMATS[fmt]
+    )
+    response.headers.set('Content-Disposition', 'attachment',
+                         filename=export_filename(source, fmt, date_from, date_to, compress))
+    # nginx отдает куски по мере готовности, а не после буферизации всего ответа
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def ingest_queue_full():
+    response = jsonify({'error': 'Сервер перегружен, повторите попытку позже'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 # Получить IP адрес пользователя
 def get_client_ip():
-    if request.environ.get('HTTP_X_FORWARDED_FOR'):
-        return request.environ['HTTP_X_FORWARDED_FOR'].split(',')[0]
-    else:
-        return request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
+    # X-Forwarded-For разбирает ProxyFix (PROXY_TRUSTED_HOPS): первое значение заголовка
+    # задает клиент, и по нему лимит обходился бы подменой IP в каждом запросе
+    return request.remote_addr
 
 # Эндпоинт для создания жалобы
 @complaint_routes.route('/api/complaints', methods=['POST'])
+@rate_limited('complaints', get_client_ip)
 def create_complaint():
     try:
         data = request.get_json()
@@ -351,68 +757,82 @@ def create_complaint():
         ip_address = get_client_ip()
         user_agent = request.headers.get('User-Agent', 'Не указан')
         
-        complaint = Complaint(
-            ip_address=ip_address,
-            user_agent=user_agent,
-            complaint_text=data.get('complaint_text')
-        )
+        complaint_data = {
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'complaint_text': data.get('complaint_text'),
+            'created_at': datetime.utcnow(),
+            'public_id': str(uuid.uuid4())
+        }
+        
+        if current_app.config['INGEST_MODE'] == 'batched':
+            get_writer().submit('complaints', complaint_data)
+            return jsonify({
+                'message': 'Жалоба принята',
+                'submission_id': complaint_data['public_id']
+            }), 202
         
+        complaint = Complaint(**complaint_data)
         db.session.add(complaint)
+        bump_rollup('complaints', [complaint.created_at])
         db.session.commit()
         
         return jsonify({
             'message': 'Жалоба успешно отправлена',
-            'complaint_id': complaint.id
+            'complaint_id': complaint.id,
+            'submission_id': complaint.public_id
         }), 201
         
+    except IngestQueueFull:
+        return ingest_queue_full()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Ошибка при отправке жалобы: {str(e)}'}), 500
 
 # Эндпоинт для получения всех жалоб (только для админов)
 @complaint_routes.route('/api/complaints', methods=['GET'])
-@jwt_required()
-def get_all_complaints():
+@admin_required
+def get_all_complaints(identity):
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(int(current_user_id))
-        
-        if not user or user.role != 'admin':
-            return jsonify({'error': 'Доступ запрещен'}), 403
-        
-        complaints = Complaint.query.order_by(Complaint.created_at.desc()).all()
-        return jsonify([complaint.to_dict() for complaint in complaints])
+        return keyset_listing(Complaint)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Выгрузка жалоб в CSV/NDJSON (только для админов)
+@complaint_routes.route('/api/complaints/export', methods=['GET'])
+@admin_required
+def export_complaints(identity):
+    try:
+        return export_response('complaints')
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Поиск по тексту жалоб (только для админов)
+@complaint_routes.route('/api/complaints/search', methods=['GET'])
+@admin_required
+def search_complaints(identity):
+    try:
+        return search_response('complaints')
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Эндпоинт для получения статистики по жалобам (только для админов)
 @complaint_routes.route('/api/complaints/stats', methods=['GET'])
-@jwt_required()
-def get_complaints_stats():
+@admin_required
+def get_complaints_stats(identity):
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(int(current_user_id))
-        
-        if not user or user.role != 'admin':
-            return jsonify({'error': 'Доступ запрещен'}), 403
-        
-        total_complaints = Complaint.query.count()
-        
-        # Жалобы за последние 7 дней
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_complaints = Complaint.query.filter(Complaint.created_at >= week_ago).count()
-        
-        return jsonify({
-            'total_complaints': total_complaints,
-            'recent_complaints': recent_complaints
-        })
+        # Счетчики читаются из почасового rollup, окно задается ?window=24h|7d|30d
+        return stats_response('complaints', 'complaints')
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Эндпоинт для создания обратной связи
 @feedback_routes.route('/api/feedback', methods=['POST'])
+@rate_limited('feedback', get_client_ip)
 def create_feedback():
     try:
         data = request.get_json()
@@ -424,64 +844,187 @@ def create_feedback():
         ip_address = get_client_ip()
         user_agent = request.headers.get('User-Agent', 'Не указан')
         
-        feedback = Feedback(
-            name=data.get('name'),
-            email=data.get('email'),
-            message=data.get('message'),
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
+        feedback_data = {
+            'name': data.get('name'),
+            'email': data.get('email'),
+            'message': data.get('message'),
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'created_at': datetime.utcnow(),
+            'public_id': str(uuid.uuid4())
+        }
+        
+        if current_app.config['INGEST_MODE'] == 'batched':
+            get_writer().submit('feedback', feedback_data)
+            return jsonify({
+                'message': 'Форма обратной связи принята',
+                'submission_id': feedback_data['public_id']
+            }), 202
         
+        feedback = Feedback(**feedback_data)
         db.session.add(feedback)
+        bump_rollup('feedback', [feedback.created_at])
         db.session.commit()
         
         return jsonify({
             'message': 'Форма обратной связи успешно отправлена',
-            'feedback_id': feedback.id
+            'feedback_id': feedback.id,
+            'submission_id': feedback.public_id
         }), 201
         
+    except IngestQueueFull:
+        return ingest_queue_full()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Ошибка при отправке формы: {str(e)}'}), 500
 
 # Эндпоинт для получения всех форм обратной связи (только для админов)
 @feedback_routes.route('/api/feedback', methods=['GET'])
-@jwt_required()
-def get_all_feedback():
+@admin_required
+def get_all_feedback(identity):
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(int(current_user_id))
-        
-        if not user or user.role != 'admin':
-            return jsonify({'error': 'Доступ запрещен'}), 403
-        
-        feedback_list = Feedback.query.order_by(Feedback.created_at.desc()).all()
-        return jsonify([feedback.to_dict() for feedback in feedback_list])
+        return keyset_listing(Feedback)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Выгрузка обратной связи в CSV/NDJSON (только для админов)
+@feedback_routes.route('/api/feedback/export', methods=['GET'])
+@admin_required
+def export_feedback(identity):
+    try:
+        return export_response('feedback')
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Поиск по имени, email и тексту обратной связи (только для админов)
+@feedback_routes.route('/api/feedback/search', methods=['GET'])
+@admin_required
+def search_feedback(identity):
+    try:
+        return search_response('feedback')
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Эндпоинт для получения статистики по обратной связи (только для админов)
 @feedback_routes.route('/api/feedback/stats', methods=['GET'])
-@jwt_required()
-def get_feedback_stats():
+@admin_required
+def get_feedback_stats(identity):
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(int(current_user_id))
+        # Счетчики читаются из почасового rollup, окно задается ?window=24h|7d|30d
+        return stats_response('feedback', 'feedback')
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def can_view_grades(identity, student_id):
+    """Оценки видят преподаватели, админы и сам студент"""
+    return identity.role in ('admin', 'teacher') or identity.student_id == student_id
+
+# Выставление оценок пачкой (преподаватели и админы)
+@grade_routes.route('/api/grades', methods=['POST'])
+@teacher_required
+def create_grades(identity):
+    try:
+        data = request.get_json(silent=True)
+        rows = data.get('grades') if isinstance(data, dict) else data
+        
+        rows, errors = validate_grades(rows)
+        if errors:
+            # Ведомость записывается целиком или не записывается вовсе
+            return jsonify({'error': 'Оценки не сохранены', 'errors': errors}), 400
         
-        if not user or user.role != 'admin':
+        return jsonify({'message': 'Оценки сохранены', 'created': record_grades(rows)}), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка при сохранении оценок: {str(e)}'}), 500
+
+# Оценки студента, новые сначала, постранично (?cursor=, ?limit=, ?subject=)
+@grade_routes.route('/api/students/<int:student_id>/grades', methods=['GET'])
+@roles_required()
+def get_student_grades(student_id, identity):
+    try:
+        if not can_view_grades(identity, student_id):
             return jsonify({'error': 'Доступ запрещен'}), 403
         
-        total_feedback = Feedback.query.count()
+        try:
+            cursor, limit = parse_page_args(parse=date.fromisoformat)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Формы за последние 7 дней
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_feedback = Feedback.query.filter(Feedback.created_at >= week_ago).count()
+        query = Grade.query.filter_by(student_id=student_id)
+        if request.args.get('subject'):
+            query = query.filter_by(subject=request.args['subject'])
+        grades = keyset_query(Grade, cursor, limit + 1, column=Grade.date, query=query).all()
         
+        has_more = len(grades) > limit
+        grades = grades[:limit]
         return jsonify({
-            'total_feedback': total_feedback,
-            'recent_feedback': recent_feedback
+            'items': [grade.to_dict() for grade in grades],
+            'next_cursor': encode_cursor(grades[-1].date, grades[-1].id) if has_more else None,
+            'limit': limit
         })
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+# Средние и распределение оценок студента по предметам (?from=, ?to=)
+@grade_routes.route('/api/students/<int:student_id>/grades/summary', methods=['GET'])
+@roles_required()
+def get_student_grade_summary(student_id, identity):
+    try:
+        if not can_view_grades(identity, student_id):
+            return jsonify({'error': 'Доступ запрещен'}), 403
+        
+        try:
+            date_from, date_to = parse_period_args()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        summary = grade_summary('subject', student_id=student_id, date_from=date_from, date_to=date_to)
+        return jsonify({'student_id': student_id, **summary})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Средние и распределение оценок группы по предметам (?from=, ?to=)
+@grade_routes.route('/api/groups/<int:group_id>/grades/summary', methods=['GET'])
+@teacher_required
+def get_group_grade_summary(group_id, identity):
+    try:
+        name = get_group_registry().name_for(group_id)
+        if name is None:
+            return jsonify({'error': 'Группа не найдена'}), 404
+        
+        try:
+            date_from, date_to = parse_period_args()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        summary = grade_summary('subject', group_id=group_id, date_from=date_from, date_to=date_to)
+        return jsonify({'group_id': group_id, 'group': name, **summary})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Сравнение групп: средний балл и распределение по каждой группе (?from=, ?to=)
+@grade_routes.route('/api/grades/summary/groups', methods=['GET'])
+@teacher_required
+def get_groups_grade_summary(identity):
+    try:
+        try:
+            date_from, date_to = parse_period_args()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        registry = get_group_registry()
+        summary = grade_summary('group', date_from=date_from, date_to=date_to)
+        for item in summary['items']:
+            item['group'] = registry.name_for(item['group_id'])
+        return jsonify(summary)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -34,20 +34,24 @@ def init_test_data():
             print(f'✅ Создана группа: {group_name}')
 
 if __name__ == '__main__':
+    # Сервер для разработки. В продакшене: flask db upgrade + gunicorn (см. README)
+    import sys
+    from commands import apply_migrations
+    from search import drop_search_index
+    
     with app.app_context():
         try:
-            # Импортируем все модели для создания таблиц
-            from models import User, Student, Group, Grade, PortfolioFile, Complaint, Feedback
+            if '--reset' in sys.argv:
+                # Полное пересоздание БД - только по явному флагу
+                print("🔄 Удаление старых таблиц...")
+                db.drop_all()
+                drop_search_index()
+                db.session.execute(db.text('DROP TABLE IF EXISTS alembic_version'))
+                db.session.commit()
             
-            # Принудительно удаляем и создаем все таблицы
-            print("🔄 Удаление старых таблиц...")
-            db.drop_all()
-            print("🔄 Создание новых таблиц...")
-            db.create_all()
-            print("✅ Все таблицы базы данных пересозданы")
-            print("✅ Включая таблицу PortfolioFile для портфолио")
-            print("✅ Включая таблицу Complaint для жалоб")
-            print("✅ Включая таблицу Feedback для обратной связи")
+            print("🔄 Применение миграций...")
+            apply_migrations()
+            print("✅ Схема базы данных актуальна")
             
             init_test_data()
             db.session.commit()
@@ -0,0 +1,92 @@
+import html
+import re
+from sqlalchemy import text
+from extensions import db
+from models import Complaint, Feedback
+
+# Источник -> (модель, таблица FTS5, индексируемые столбцы в порядке индекса)
+SEARCH_INDEXES = {
+    'complaints': (Complaint, 'complaint_fts', ['complaint_text']),
+    'feedback': (Feedback, 'feedback_fts', ['name', 'email', 'message'])
+}
+
+MAX_QUERY_TERMS = 16
+SNIPPET_TOKENS = 32
+# Управляющие символы вместо <mark>: текст экранируется уже после snippet()
+MARK_OPEN, MARK_CLOSE = '\x02', '\x03'
+
+class SearchUnavailable(Exception):
+    """Полнотекстовый поиск работает только на SQLite с FTS5"""
+
+def search_available():
+    return db.session.get_bind().dialect.name == 'sqlite'
+
+def build_match(query):
+    """Строка поиска -> выражение MATCH: все слова обязательны, последнее - как префикс.
+
+    Операторы FTS5 из ввода не пропускаются, каждое слово берется в кавычки.
+    """
+    terms = re.findall(r'\w+', query or '')[:MAX_QUERY_TERMS]
+    if not terms:
+        raise ValueError('Параметр q должен содержать хотя бы одно слово')
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+def render_highlight(fragment):
+    """Экранирует фрагмент snippet() и расставляет <mark> вокруг совпадений"""
+    if fragment is None:
+        return None
+    return html.escape(fragment).replace(MARK_OPEN, '<mark>').replace(MARK_CLOSE, '</mark>')
+
+def search(source, query, limit, offset=0):
+    """Записи источника по релевантности (bm25) с подсветкой совпадений.
+
+    Возвращает (список (запись, {столбец: фрагмент}), есть ли еще результаты).
+    """
+    if not search_available():
+        raise SearchUnavailable()
+
+    model, index, columns = SEARCH_INDEXES[source]
+    snippets = ', '.join(
+        f"snippet({index}, {number}, :mark_open, :mark_close, '…', {SNIPPET_TOKENS})"
+        for number in range(len(columns))
+    )
+    rows = db.session.execute(text(
+        f"SELECT rowid, {snippets} FROM {index} WHERE {index} MATCH :match "
+        f"ORDER BY bm25({index}), rowid LIMIT :limit OFFSET :offset"
+    ), {
+        'match': build_match(query),
+        'mark_open': MARK_OPEN,
+        'mark_close': MARK_CLOSE,
+        'limit': limit + 1,
+        'offset': offset
+    }).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = {item.id: item for item in model.query.filter(model.id.in_([row[0] for row in rows]))}
+    results = [
+        (items[row[0]], {column: render_highlight(fragment) for column, fragment in zip(columns, row[1:])})
+        for row in rows if row[0] in items
+    ]
+    return results, has_more
+
+def rebuild_search_index():
+    """Перестраивает индексы FTS5 по содержимому таблиц, возвращает {источник: число записей}"""
+    if not search_available():
+        raise SearchUnavailable()
+
+    result = {}
+    for source, (model, index, _) in SEARCH_INDEXES.items():
+        db.session.execute(text(f"INSERT INTO {index}({index}) VALUES ('rebuild')"))
+        result[source] = model.query.count()
+    db.session.commit()
+    return result
+
+def drop_search_index():
+    """Удаляет индексы FTS5 (run.py --reset: drop_all про них не знает)"""
+    if not search_available():
+        return
+    for _, index, _ in SEARCH_INDEXES.values():
+        db.session.execute(text(f'DROP TABLE IF EXISTS {index}'))
@@ -0,0 +1,116 @@
+from collections import Counter
+from datetime import datetime, timedelta
+import re
+from sqlalchemy import func, select
+from extensions import db
+from database import dialect_insert
+from models import Complaint, Feedback, SubmissionRollup
+
+# Источник статистики -> модель с полем created_at
+SOURCES = {
+    'complaints': Complaint,
+    'feedback': Feedback
+}
+
+MAX_WINDOW = timedelta(days=366)
+SERIES_STEPS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1)
+}
+
+def hour_bucket(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def bump_rollup(source, moments):
+    """Добавляет записи в почасовые счетчики в текущей транзакции (коммит делает вызывающий код)"""
+    buckets = Counter(hour_bucket(moment) for moment in moments)
+    if not buckets:
+        return
+
+    stmt = dialect_insert(SubmissionRollup).values([
+        {'source': source, 'bucket_start': bucket, 'count': count}
+        for bucket, count in buckets.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['source', 'bucket_start'],
+        set_={'count': SubmissionRollup.count + stmt.excluded['count']}
+    )
+    db.session.execute(stmt)
+
+def parse_window(value):
+    """'24h', '7d', '30d' -> timedelta; ValueError для некорректного окна"""
+    match = re.fullmatch(r'(\d+)([hd])', value or '')
+    if not match:
+        raise ValueError('window должен быть вида 24h, 7d, 30d')
+
+    amount, unit = int(match.group(1)), match.group(2)
+    window = timedelta(hours=amount) if unit == 'h' else timedelta(days=amount)
+    if not timedelta(0) < window <= MAX_WINDOW:
+        raise ValueError('window должен быть от 1h до 366d')
+    return window
+
+def rollup_query(source, since=None):
+    """Сумма счетчиков источника, при since - начиная с часа since"""
+    query = db.session.query(func.coalesce(func.sum(SubmissionRollup.count), 0)).filter(
+        SubmissionRollup.source == source
+    )
+    if since is not None:
+        query = query.filter(SubmissionRollup.bucket_start >= hour_bucket(since))
+    return query
+
+def rollup_stats(source, window, series=None):
+    """Всего, за окно и (по запросу) ряд по часам или дням.
+
+    Окно округляется вниз до начала часа, поэтому может захватить до часа лишних записей.
+    """
+    since = datetime.utcnow() - window
+    stats = {
+        'total': rollup_query(source).scalar(),
+        'recent': rollup_query(source, since).scalar()
+    }
+
+    if series:
+        step = SERIES_STEPS[series]
+        rows = db.session.query(SubmissionRollup.bucket_start, SubmissionRollup.count).filter(
+            SubmissionRollup.source == source,
+            SubmissionRollup.bucket_start >= hour_bucket(since)
+        ).all()
+
+        totals = Counter()
+        for bucket_start, count in rows:
+            if series == 'day':
+                bucket_start = bucket_start.replace(hour=0)
+            totals[bucket_start] += count
+
+        start = hour_bucket(since)
+        if series == 'day':
+            start = start.replace(hour=0)
+        points = []
+        while start <= datetime.utcnow():
+            points.append({'start': start.isoformat(), 'count': totals.get(start, 0)})
+            start += step
+        stats['series'] = points
+
+    return stats
+
+def _hour_expr(column):
+    # Формат совпадает с тем, как SQLAlchemy хранит DateTime в SQLite
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.date_trunc('hour', column)
+    return func.strftime('%Y-%m-%d %H:00:00.000000', column)
+
+def rebuild_rollup():
+    """Пересчитывает счетчики по существующим записям, возвращает {источник: число записей}"""
+    result = {}
+    db.session.query(SubmissionRollup).delete()
+    for source, model in SOURCES.items():
+        bucket = _hour_expr(model.created_at)
+        rows = select(db.literal(source), bucket, func.count()).where(
+            model.created_at.isnot(None)
+        ).group_by(bucket)
+        db.session.execute(
+            SubmissionRollup.__table__.insert().from_select(['source', 'bucket_start', 'count'], rows)
+        )
+        result[source] = rollup_query(source).scalar()
+    db.session.commit()
+    return result
@@ -0,0 +1,211 @@
+import os
+import shutil
+import tempfile
+import threading
+from urllib.parse import quote
+from flask import current_app
+
+class BlobNotFound(Exception):
+    """Блоба с таким именем нет в хранилище"""
+
+def shard_path(blob_name):
+    """ab/cd/<имя>: по 256 подкаталогов на уровень вместо одного каталога на все файлы"""
+    return f'{blob_name[0:2]}/{blob_name[2:4]}/{blob_name}'
+
+class Storage:
+    """Хранилище блобов портфолио. Новое хранилище реализует те же методы
+    и регистрируется в STORAGE_BACKENDS."""
+
+    # Каталог для временных файлов загрузки (None - системный)
+    tmp_dir = None
+
+    def save(self, blob_name, tmp_path):
+        """Кладет временный файл под именем blob_name (файл забирается), существующий блоб заменяется"""
+        raise NotImplementedError
+
+    def open(self, blob_name):
+        """Бинарный файловый объект для чтения, BlobNotFound если блоба нет"""
+        raise NotImplementedError
+
+    def exists(self, blob_name):
+        raise NotImplementedError
+
+    def delete(self, blob_name):
+        """Удаляет блоб, отсутствие блоба - не ошибка"""
+        raise NotImplementedError
+
+    def local_path(self, blob_name):
+        """Путь на диске для send_file и X-Accel-Redirect или None (удаленное хранилище)"""
+        return None
+
+    def url(self, blob_name, filename):
+        """Временная ссылка на скачивание для хранилищ без локального пути"""
+        raise NotImplementedError
+
+class LocalStorage(Storage):
+    """Блобы на диске в дереве <root>/ab/cd/<имя>.
+
+    Файлы из старой плоской раскладки (<root>/<имя>) тоже читаются и удаляются,
+    поэтому `flask storage-migrate` переносит их без остановки приложения.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.tmp_dir = os.path.join(self.root, '.tmp')
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def _paths(self, blob_name):
+        return os.path.join(self.root, shard_path(blob_name)), os.path.join(self.root, blob_name)
+
+    def local_path(self, blob_name):
+        for path in self._paths(blob_name):
+            if os.path.exists(path):
+                return path
+        return None
+
+    def save(self, blob_name, tmp_path):
+        path = self._paths(blob_name)[0]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    def open(self, blob_name):
+        path = self.local_path(blob_name)
+        if path is None:
+            raise BlobNotFound(blob_name)
+        return open(path, 'rb')
+
+    def exists(self, blob_name):
+        return self.local_path(blob_name) is not None
+
+    def delete(self, blob_name):
+        for path in self._paths(blob_name):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+class S3Storage(Storage):
+    """S3-совместимое хранилище (AWS S3, MinIO, moto server) через boto3.
+
+    Ключ - PORTFOLIO_S3_PREFIX + ab/cd/<имя>, учетные данные boto3 берет из
+    окружения (AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY). Скачивание идет по
+    временной ссылке, минуя приложение.
+    """
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None, url_ttl=300):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError('Для PORTFOLIO_STORAGE=s3 нужен пакет boto3: pip install -r requirements-s3.txt')
+        self._boto3 = boto3
+        self.bucket = bucket
+        self.prefix = prefix
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self.url_ttl = url_ttl
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Клиент с пулом соединений создается заново после fork (gunicorn preload)
+        with self._lock:
+            if self._client is None or self._pid != os.getpid():
+                self._client = self._boto3.client('s3', endpoint_url=self.endpoint_url, region_name=self.region)
+                self._pid = os.getpid()
+            return self._client
+
+    def key(self, blob_name):
+        return self.prefix + shard_path(blob_name)
+
+    def save(self, blob_name, tmp_path):
+        try:
+            self.client.upload_file(tmp_path, self.bucket, self.key(blob_name))
+        finally:
+            os.remove(tmp_path)
+
+    def open(self, blob_name):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.key(blob_name))['Body']
+        except self.client.exceptions.NoSuchKey:
+            raise BlobNotFound(blob_name)
+
+    def exists(self, blob_name):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.key(blob_name))
+        except self.client.exceptions.ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                return False
+            raise
+        return True
+
+    def delete(self, blob_name):
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(blob_name))
+
+    def url(self, blob_name, filename):
+        return self.client.generate_presigned_url('get_object', Params={
+            'Bucket': self.bucket,
+            'Key': self.key(blob_name),
+            'ResponseContentDisposition': f"attachment; filename*=UTF-8''{quote(filename)}"
+        }, ExpiresIn=self.url_ttl)
+
+STORAGE_BACKENDS = {
+    'local': lambda config: LocalStorage(config['PORTFOLIO_STORAGE_ROOT']),
+    's3': lambda config: S3Storage(
+        config['PORTFOLIO_S3_BUCKET'],
+        prefix=config['PORTFOLIO_S3_PREFIX'],
+        endpoint_url=config['PORTFOLIO_S3_ENDPOINT_URL'],
+        region=config['PORTFOLIO_S3_REGION'],
+        url_ttl=config['PORTFOLIO_S3_URL_TTL']
+    )
+}
+
+_storage_lock = threading.Lock()
+
+def get_storage():
+    storage = current_app.extensions.get('portfolio_storage')
+    if storage is None:
+        with _storage_lock:
+            storage = current_app.extensions.get('portfolio_storage')
+            if storage is None:
+                config = current_app.config
+                if config['PORTFOLIO_STORAGE'] not in STORAGE_BACKENDS:
+                    raise ValueError(f"Неизвестный PORTFOLIO_STORAGE: {config['PORTFOLIO_STORAGE']}")
+                storage = STORAGE_BACKENDS[config['PORTFOLIO_STORAGE']](config)
+                current_app.extensions['portfolio_storage'] = storage
+    return storage
+
+def migrate_blobs(storage, blob_names, source_root, dry_run=False):
+    """Переносит блобы из плоского каталога source_root в хранилище.
+
+    Если source_root - корень того же LocalStorage, файлы переезжают в подкаталоги
+    атомарным rename и читаются все время переноса. В другое хранилище (другой
+    каталог, S3) блобы копируются, источник остается до переключения настроек;
+    повторный запуск докопирует загруженное за это время.
+    Возвращает счетчики {'moved', 'copied', 'skipped', 'missing'}.
+    """
+    source_root = os.path.abspath(source_root)
+    in_place = isinstance(storage, LocalStorage) and storage.root == source_root
+    result = {'moved': 0, 'copied': 0, 'skipped': 0, 'missing': 0}
+
+    for blob_name in blob_names:
+        source = os.path.join(source_root, blob_name)
+        if not os.path.exists(source):
+            result['skipped' if storage.exists(blob_name) else 'missing'] += 1
+            continue
+        if in_place:
+            if not dry_run:
+                storage.save(blob_name, source)
+            result['moved'] += 1
+            continue
+        if storage.exists(blob_name):
+            result['skipped'] += 1
+            continue
+        if not dry_run:
+            fd, tmp_path = tempfile.mkstemp(dir=storage.tmp_dir, prefix='.migrate-')
+            os.close(fd)
+            shutil.copyfile(source, tmp_path)
+            storage.save(blob_name, tmp_path)
+        result['copied'] += 1
+    return result
@@ -0,0 +1,200 @@
+import hashlib
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import false, text, update
+from extensions import db
+from jobs import job_handler
+from models import PortfolioFile
+from storage import get_storage
+
+# Настройки для загрузки файлов (сами файлы - в storage.py, PORTFOLIO_STORAGE)
+ALLOWED_EXTENSIONS = {'pdf', 'jpg', 'jpeg', 'png', 'doc', 'docx'}
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
+# Несколько файлов в одном запросе: не больше штук и байт на запрос
+MAX_FILES_PER_UPLOAD = 20
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024  # 50 MB
+CHUNK_SIZE = 64 * 1024
+
+# Сигнатуры начала файла для проверки, что содержимое соответствует расширению
+FILE_SIGNATURES = {
+    'pdf': (b'%PDF-', 'application/pdf'),
+    'png': (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    'jpg': (b'\xff\xd8\xff', 'image/jpeg'),
+    'jpeg': (b'\xff\xd8\xff', 'image/jpeg'),
+    'doc': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/msword'),
+    # docx - zip-архив
+    'docx': (b'PK\x03\x04', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+}
+
+class FileTooLarge(Exception):
+    """Загружаемый файл превысил MAX_FILE_SIZE"""
+
+def allowed_file(filename):
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def is_content_addressed(blob_name):
+    """Файлы, загруженные до хранения по хешу, названы <uuid>.<ext>"""
+    return re.fullmatch(r'[0-9a-f]{64}', blob_name) is not None
+
+def check_upload(file):
+    """Текст ошибки для файла из формы или None"""
+    if file.filename == '':
+        return 'Файл не выбран'
+    if not allowed_file(file.filename):
+        return 'Недопустимый тип файла'
+    return None
+
+def map_bounded(fn, items, workers):
+    """Как map, но в workers потоках (диск и S3 отпускают GIL); исключения возвращаются в списке, а не бросаются"""
+    def call(item):
+        try:
+            return fn(item)
+        except Exception as e:
+            return e
+
+    if workers <= 1 or len(items) <= 1:
+        return [call(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        return list(executor.map(call, items))
+
+def receive_upload(stream, tmp_dir=None):
+    """Копирует поток во временный файл кусками по CHUNK_SIZE, считая SHA-256 на лету.
+
+    Возвращает (sha256, размер, путь к временному файлу). Как только размер
+    превышает MAX_FILE_SIZE, временный файл удаляется и бросается FileTooLarge.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, prefix='.upload-')
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    raise FileTooLarge()
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return digest.hexdigest(), size, tmp_path
+
+def receive_uploads(streams, workers):
+    """receive_upload для нескольких файлов, не больше workers записей одновременно.
+
+    Возвращает в порядке streams (sha256, размер, путь) или исключение.
+    """
+    tmp_dir = get_storage().tmp_dir
+    return map_bounded(lambda stream: receive_upload(stream, tmp_dir), streams, workers)
+
+def publish_blobs(blobs, workers):
+    """Кладет временные файлы в хранилище под именами-хешами: [(имя, путь)] -> [None или исключение].
+
+    Вызывается после коммита строк PortfolioFile: если такой блоб уже есть,
+    запись заменяет его тем же содержимым. Строки коммитятся под lock_blobs,
+    поэтому параллельный release_blobs либо увидит их и не удалит блоб, либо
+    удалит его раньше, чем блоб будет записан здесь заново.
+    """
+    storage = get_storage()
+    return map_bounded(lambda blob: storage.save(*blob), blobs, workers)
+
+def discard_upload(tmp_path):
+    if tmp_path and os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+def lock_blobs(blob_names):
+    """Блокирует блобы до конца текущей транзакции.
+
+    Берется перед добавлением ссылок на блоб и перед подсчетом ссылок в
+    release_blobs, чтобы удаление блоба не пересекалось с коммитом новой ссылки.
+    В PostgreSQL - advisory-блокировка на имя, в SQLite любая запись и так
+    держит блокировку записи всей БД до коммита.
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        for blob_name in sorted(set(blob_names)):
+            db.session.execute(text('SELECT pg_advisory_xact_lock(hashtext(:name))'), {'name': blob_name})
+    else:
+        db.session.execute(update(PortfolioFile).where(false()).values(saved_filename=PortfolioFile.saved_filename))
+
+def release_blobs(blob_names):
+    """Удаляет блобы, на которые больше не ссылается ни одна строка PortfolioFile.
+
+    Подсчет ссылок и удаление идут в одной транзакции под lock_blobs; вызывать
+    после коммита удаления самих строк.
+    """
+    blob_names = set(blob_names)
+    try:
+        lock_blobs(blob_names)
+        referenced = {
+            name for (name,) in db.session.query(PortfolioFile.saved_filename)
+            .filter(PortfolioFile.saved_filename.in_(blob_names)).distinct()
+        }
+        storage = get_storage()
+        for blob_name in blob_names - referenced:
+            storage.delete(blob_name)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+def sniff_content_type(head, filename):
+    """MIME-тип по сигнатуре, если начало файла соответствует расширению, иначе None.
+
+    secure_filename выбрасывает кириллицу и может оставить имя без расширения -
+    тогда подходит любая известная сигнатура.
+    """
+    extension = filename.rsplit('.', 1)[-1].lower()
+    candidates = [FILE_SIGNATURES[extension]] if extension in FILE_SIGNATURES else FILE_SIGNATURES.values()
+    for signature, content_type in candidates:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+def read_blob(blob_name):
+    """Один проход по блобу: (SHA-256, первые 16 байт для сигнатуры)"""
+    digest = hashlib.sha256()
+    head = b''
+    with get_storage().open(blob_name) as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            if not head:
+                head = chunk[:16]
+            digest.update(chunk)
+    return digest.hexdigest(), head
+
+def fail_portfolio_file(payload, error):
+    portfolio_file = db.session.get(PortfolioFile, payload['file_id'])
+    if portfolio_file is not None:
+        portfolio_file.status = 'failed'
+        portfolio_file.processing_error = 'Не удалось обработать файл'
+
+@job_handler('portfolio.process', on_failure=fail_portfolio_file)
+def process_portfolio_file(payload):
+    """Обработка после загрузки: контрольная сумма блоба и тип содержимого.
+
+    Сюда же встанут превью для pdf/jpg/png. Несоответствие - окончательный
+    статус failed; отсутствие блоба (еще не опубликован) - исключение и повтор.
+    """
+    portfolio_file = db.session.get(PortfolioFile, payload['file_id'])
+    if portfolio_file is None or portfolio_file.status != 'pending':
+        # Файл удалили или уже обработали
+        return
+
+    sha256, head = read_blob(portfolio_file.saved_filename)
+    if is_content_addressed(portfolio_file.saved_filename) and sha256 != portfolio_file.saved_filename:
+        portfolio_file.status = 'failed'
+        portfolio_file.processing_error = 'Контрольная сумма не совпадает'
+    else:
+        content_type = sniff_content_type(head, portfolio_file.filename)
+        if content_type is None:
+            portfolio_file.status = 'failed'
+            portfolio_file.processing_error = 'Содержимое не соответствует типу файла'
+        else:
+            portfolio_file.status = 'ready'
+            portfolio_file.content_type = content_type
+    db.session.commit()
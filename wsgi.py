@@ -0,0 +1,3 @@
+# Точка входа для WSGI-сервера: gunicorn -c gunicorn.conf.py wsgi:app
+# Схема БД здесь не создается: перед запуском выполните `flask --app app db upgrade`
+from app import app